@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import ADMIN, MODERATOR, USER
+from .cache import get_cache
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'token_version'
+# Версия в кэше для удаленных и заблокированных пользователей.
+REVOKED = -1
+
+
+def issue_token(user):
+    token = AccessToken.for_user(user)
+    token['username'] = user.username
+    token['role'] = user.role
+    token['is_superuser'] = user.is_superuser
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def token_version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def remember_token_version(user_id, version):
+    get_cache().set(token_version_key(user_id), version,
+                    settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов пользователя: из кэша, при промахе из БД."""
+    version = get_cache().get(token_version_key(user_id))
+    if version is None:
+        version = User.objects.filter(
+            pk=user_id, is_active=True
+        ).values_list('token_version', flat=True).first()
+        if version is None:
+            version = REVOKED
+        remember_token_version(user_id, version)
+    return version
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, собранный из claims токена без запроса к БД.
+    Полный профиль загружается из БД только при обращении к `user`."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', USER)
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN
+
+    @cached_property
+    def user(self):
+        return User.objects.get(pk=self.pk)
+
+    def as_author(self):
+        """User только с pk и username из токена: автор нового отзыва или
+        комментария, для ответа о котором профиль из БД не нужен."""
+        return User(pk=self.pk, username=self.username)
+
+    def __str__(self):
+        return self.username
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """Проверяет подпись токена и его версию вместо чтения строки из
+    таблицы пользователей. Токены без claims роли (выданные до включения
+    режима) обрабатываются как в JWTAuthentication."""
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if version != get_token_version(user.id):
+            raise AuthenticationFailed('Токен отозван',
+                                       code='token_revoked')
+        return user
@@ -0,0 +1,254 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews import search
+from reviews.search import TITLE, search_vector_fields
+from reviews.summary import link_genres, move_title
+from .fast import TITLE_VALUES, serialize_titles
+from .serializers import ClassificationBulkSerializer, TitleBulkSerializer
+
+TITLE_FIELDS = ('name', 'year', 'description', 'category')
+
+
+def check_batch(data):
+    messages = serializers.ListField.default_error_messages
+    if not isinstance(data, list):
+        raise serializers.ValidationError(messages['not_a_list'].format(
+            input_type=type(data).__name__))
+    if len(data) > settings.API_BULK_MAX_ITEMS:
+        raise serializers.ValidationError(messages['max_length'].format(
+            max_length=settings.API_BULK_MAX_ITEMS))
+
+
+def bulk_response(results, errors, success_status):
+    """Ответ пакетного запроса: записанные объекты и ошибки по номерам
+    элементов пакета. 400 — только если не записано ничего."""
+    if errors and not results:
+        success_status = status.HTTP_400_BAD_REQUEST
+    errors.sort(key=lambda error: error['index'])
+    return Response({'results': results, 'errors': errors},
+                    status=success_status)
+
+
+def unique_message(model, field_name):
+    field = model._meta.get_field(field_name)
+    return field.error_messages['unique'] % {
+        'model_name': model._meta.verbose_name,
+        'field_label': field.verbose_name,
+    }
+
+
+def create_classifications(model, items):
+    """Создает категории или жанры одним INSERT; занятые имена и слаги
+    проверяются одним запросом на весь пакет."""
+    results, errors, valid = [], [], []
+    for index, item in enumerate(items):
+        serializer = ClassificationBulkSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    if not valid:
+        return results, errors
+
+    taken = {'name': set(), 'slug': set()}
+    existing = model.objects.filter(
+        Q(name__in=[data['name'] for index, data in valid])
+        | Q(slug__in=[data['slug'] for index, data in valid])
+    ).values_list('name', 'slug')
+    for name, slug in existing:
+        taken['name'].add(name)
+        taken['slug'].add(slug)
+    objects = []
+    for index, data in valid:
+        conflicts = {field: [unique_message(model, field)]
+                     for field in ('name', 'slug')
+                     if data[field] in taken[field]}
+        if conflicts:
+            errors.append({'index': index, 'errors': conflicts})
+            continue
+        taken['name'].add(data['name'])
+        taken['slug'].add(data['slug'])
+        objects.append((index, model(**data)))
+
+    # Строки, вставленные параллельным запросом между проверкой и INSERT,
+    # пропускаются базой; их видно по несовпадению после вставки.
+    model.objects.bulk_create([obj for index, obj in objects],
+                              ignore_conflicts=True)
+    stored = dict(model.objects.filter(
+        slug__in=[obj.slug for index, obj in objects]
+    ).values_list('slug', 'name'))
+    for index, obj in objects:
+        if stored.get(obj.slug) == obj.name:
+            results.append({'name': obj.name, 'slug': obj.slug})
+            continue
+        field = 'name' if obj.slug not in stored else 'slug'
+        errors.append({'index': index,
+                       'errors': {field: [unique_message(model, field)]}})
+    return results, errors
+
+
+def resolve_slugs(items):
+    """Слаги жанров и категорий всего пакета: по запросу на модель."""
+    slugs = {'genre': set(), 'category': set()}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        genre = item.get('genre')
+        if isinstance(genre, list):
+            slugs['genre'].update(slug for slug in genre
+                                  if isinstance(slug, str))
+        if isinstance(item.get('category'), str):
+            slugs['category'].add(item['category'])
+    context = {}
+    for key, model, field in (('genres', Genre, 'genre'),
+                              ('categories', Category, 'category')):
+        context[key] = dict(model.objects.filter(
+            slug__in=slugs[field]
+        ).values_list('slug', 'pk')) if slugs[field] else {}
+    return context
+
+
+def serialize_ids(title_ids):
+    rows = {row['id']: row for row in Title.objects.filter(
+        pk__in=title_ids).values(*TITLE_VALUES)}
+    return serialize_titles([rows[pk] for pk in title_ids])
+
+
+def reindex_titles(titles):
+    """То, что для одиночного произведения делают сигналы сохранения."""
+    title_ids = [title.pk for title in titles]
+    Title.objects.filter(pk__in=title_ids).touch(
+        **search_vector_fields(TITLE))
+    for title in titles:
+        search.index.update(TITLE, title)
+
+
+def create_titles(items):
+    """Создает произведения и их связи с жанрами двумя INSERT в одной
+    транзакции. Некорректные элементы попадают в ошибки, не прерывая
+    пакет."""
+    context = resolve_slugs(items)
+    errors, titles, genres = [], [], []
+    for index, item in enumerate(items):
+        serializer = TitleBulkSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        data = dict(serializer.validated_data)
+        genres.append(data.pop('genre', []))
+        data['category_id'] = data.pop('category', None)
+        titles.append(Title(**data))
+    if not titles:
+        return [], errors
+
+    connection = connections[router.db_for_write(Title)]
+    with transaction.atomic(using=connection.alias):
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+            reindex_titles(titles)
+        else:
+            # Без RETURNING первичные ключи не узнать: по одному INSERT.
+            for title in titles:
+                title.save(force_insert=True)
+        GenreTitle.objects.bulk_create([
+            GenreTitle(title_id=title.pk, genre_id=genre_id)
+            for title, genre_ids in zip(titles, genres)
+            for genre_id in genre_ids
+        ])
+    return serialize_ids([title.pk for title in titles]), errors
+
+
+def update_titles(items):
+    """Частично обновляет произведения по id одним UPDATE; жанры, если
+    они переданы, заменяются целиком."""
+    context = resolve_slugs(items)
+    titles = Title.objects.in_bulk([
+        item['id'] for item in items
+        if isinstance(item, dict) and isinstance(item.get('id'), int)
+    ])
+    errors, updated, new_genres = [], {}, {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'id' not in item:
+            errors.append({'index': index, 'errors': {'id': [
+                serializers.Field.default_error_messages['required']]}})
+            continue
+        title = (titles.get(item['id'])
+                 if isinstance(item['id'], int) else None)
+        if title is None:
+            errors.append({'index': index,
+                           'errors': {'id': [NotFound.default_detail]}})
+            continue
+        serializer = TitleBulkSerializer(title, data=item, partial=True,
+                                         context=context)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        data = dict(serializer.validated_data)
+        if 'genre' in data:
+            new_genres[title.pk] = set(data.pop('genre'))
+        if 'category' in data:
+            title.category_id = data.pop('category')
+        for field, value in data.items():
+            setattr(title, field, value)
+        updated[title.pk] = title
+    if not updated:
+        return [], errors
+
+    with transaction.atomic(using=router.db_for_write(Title)):
+        Title.objects.bulk_update(updated.values(), TITLE_FIELDS)
+        reindex_titles(updated.values())
+        for title in updated.values():
+            move_title(title.pk, title._summary_category_id,
+                       title._summary_year, title.category_id, title.year)
+            title.remember_summary_state()
+        update_genres(new_genres)
+    return serialize_ids(list(updated)), errors
+
+
+def update_genres(new_genres):
+    current = defaultdict(set)
+    for title_id, genre_id in GenreTitle.objects.filter(
+            title_id__in=new_genres).values_list('title_id', 'genre_id'):
+        current[title_id].add(genre_id)
+    removed, added = Q(), defaultdict(list)
+    for title_id, genre_ids in new_genres.items():
+        if current[title_id] - genre_ids:
+            removed |= Q(title_id=title_id,
+                         genre_id__in=current[title_id] - genre_ids)
+        for genre_id in genre_ids - current[title_id]:
+            added[genre_id].append(title_id)
+    if removed:
+        # Удаление посылает post_delete, сводка отзывов обновится им.
+        GenreTitle.objects.filter(removed).delete()
+    GenreTitle.objects.bulk_create([
+        GenreTitle(title_id=title_id, genre_id=genre_id)
+        for genre_id, title_ids in added.items() for title_id in title_ids
+    ])
+    for genre_id, title_ids in added.items():
+        link_genres(title_ids, [genre_id])
+
+
+class BulkCreateMixin:
+    """POST списка объектов вместо одного создает их пакетом методом
+    bulk_create(items) представления, который возвращает (results,
+    errors)."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'bulk_create', None)):
+            raise TypeError(f'{cls.__name__} must define bulk_create(items)')
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        check_batch(request.data)
+        results, errors = self.bulk_create(request.data)
+        return bulk_response(results, errors, status.HTTP_201_CREATED)
@@ -0,0 +1,147 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.response import Response
+
+from .replicas import is_fresh, read_position, use_fresh_replica, wal_position
+
+CATEGORIES = 'categories'
+GENRES = 'genres'
+CATALOGUE = 'catalogue'
+TITLES = 'titles'
+
+
+def title_scope(title_id):
+    return f'title:{title_id}'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def generation_key(scope):
+    return f'api:generation:{scope}'
+
+
+def position_key(scope):
+    return f'api:position:{scope}'
+
+
+def record_position(scopes):
+    """Запоминает позицию журнала основной БД после записи, которая
+    изменила области кэша. Запись в кэш не атомарна: при гонке может
+    остаться позиция параллельной записи, меньшая на несколько байт."""
+    position = wal_position(DEFAULT_DB_ALIAS)
+    if position is not None:
+        get_cache().set_many(
+            {position_key(scope): position for scope in scopes}, None)
+
+
+def required_position(scopes):
+    """Позиция, до которой БД должна дойти, чтобы ответ учитывал все
+    записи в областях кэша; None, если таких записей не известно."""
+    positions = get_cache().get_many(
+        [position_key(scope) for scope in scopes]).values()
+    return max(positions, default=None)
+
+
+def get_generations(scopes):
+    """Текущие поколения областей кэша; отсутствующие заводятся заново
+    значением от времени, чтобы не совпасть с вытесненными."""
+    cache = get_cache()
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    if settings.DATABASE_REPLICAS:
+        record_position(scopes)
+
+
+def invalidate(*scopes):
+    """Сбрасывает области кэша после фиксации транзакции: ответ, который
+    параллельный запрос построил бы по данным до фиксации, иначе попал
+    бы в кэш под новым поколением."""
+    transaction.on_commit(lambda: bump_generations(scopes))
+
+
+def get_role(user):
+    if not (user and user.is_authenticated):
+        return 'anonymous'
+    if user.is_superuser:
+        return 'superuser'
+    return user.role
+
+
+def response_cache_key(request, scopes):
+    generations = '.'.join(str(value) for value in get_generations(scopes))
+    # Ссылки next/previous в ответе абсолютные: схема и хост входят в ключ.
+    path = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'api:entry:{generations}:{get_role(request.user)}:{path}'
+
+
+class CachedResponseMixin:
+    """Кэширует данные ответов list/retrieve до изменения связанных
+    моделей (см. api/signals.py).
+
+    Вместе с данными хранится позиция журнала БД, по которой они
+    построены. Запрос читает из реплики, только если она дошла до
+    позиции последней записи в областях кэша (иначе из основной БД), и
+    не берет из кэша данные, построенные раньше этой позиции. Так
+    версия для ETag, данные и кэш берутся из одного состояния БД."""
+
+    cache_scopes = ()
+    required_position = None
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def uses_cache(self, request):
+        return (self.action in ('list', 'retrieve')
+                and settings.API_CACHE_TIMEOUT
+                and not getattr(request, 'profiling', False))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if settings.DATABASE_REPLICAS and self.uses_cache(request):
+            self.required_position = required_position(
+                self.get_cache_scopes())
+            use_fresh_replica(self.required_position)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.uses_cache(request):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_cache_key(request, self.get_cache_scopes())
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry[0],
+                                          self.required_position):
+            return Response(entry[1])
+        position = read_position() if settings.DATABASE_REPLICAS else None
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (position, response.data),
+                      settings.API_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args,
+                                    **kwargs)
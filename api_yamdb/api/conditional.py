@@ -0,0 +1,50 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list/retrieve по версии объекта.
+
+    Проверка If-None-Match выполняется до выборки и сериализации данных:
+    достаточно одного запроса к индексу по первичному ключу."""
+
+    def get_version(self):
+        """Возвращает пару (version, modified) или None, если объекта нет."""
+        return None
+
+    def get_validators(self, request):
+        version = self.get_version()
+        if version is None:
+            return None, None
+        number, modified = version
+        source = ':'.join((
+            self.basename, self.action, str(number),
+            request.accepted_renderer.format, request.get_full_path(),
+        ))
+        etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+        return etag, int(modified.timestamp())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args,
+                                         **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args,
+                                         **kwargs)
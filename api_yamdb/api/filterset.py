@@ -8,6 +8,10 @@ class TitleFilter(django_filters.FilterSet):
     category = django_filters.CharFilter(field_name='category__slug')
     name = django_filters.CharFilter(field_name='name',
                                      lookup_expr='icontains')
+    rating_min = django_filters.NumberFilter(field_name='rating',
+                                             lookup_expr='gte')
+    rating_max = django_filters.NumberFilter(field_name='rating',
+                                             lookup_expr='lte')
 
     class Meta:
         model = Title
@@ -0,0 +1,125 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import issue_token
+from reviews.models import ADMIN, Comment, Review, Title, User
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+class Command(BaseCommand):
+    help = ('Measure p50/p99 latency and DB query count of the API routes. '
+            'Args: [--repeat <count>] [--output <file.json>] '
+            '[--compare <file.json>] [--no-cache]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output',
+                            help='Save results to a JSON file')
+        parser.add_argument('--compare',
+                            help='JSON file of a previous run to compare')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Disable the catalogue response cache')
+
+    def get_endpoints(self):
+        title = Title.objects.order_by('-reviews_count', 'pk').first()
+        if title is None:
+            raise CommandError(
+                'Database is empty: run generate_load_data first')
+        endpoints = [
+            ('titles-list', '/api/v1/titles/'),
+            ('titles-filter', '/api/v1/titles/?genre=genre-3&year=1999'),
+            ('titles-ordering', '/api/v1/titles/?ordering=-rating'),
+            ('titles-detail', f'/api/v1/titles/{title.pk}/'),
+            ('categories-list', '/api/v1/categories/'),
+            ('genres-list', '/api/v1/genres/'),
+            ('reviews-list', f'/api/v1/titles/{title.pk}/reviews/'),
+            ('reviews-cursor',
+             f'/api/v1/titles/{title.pk}/reviews/?cursor='),
+            ('search', '/api/v1/search/?q=star'),
+        ]
+        review = Review.objects.filter(title=title).order_by('pk').first()
+        if review is not None:
+            prefix = f'/api/v1/titles/{title.pk}/reviews/{review.pk}'
+            endpoints += [
+                ('reviews-detail', f'{prefix}/'),
+                ('comments-list', f'{prefix}/comments/'),
+            ]
+            comment = Comment.objects.filter(review=review).first()
+            if comment is not None:
+                endpoints.append(
+                    ('comments-detail', f'{prefix}/comments/{comment.pk}/')
+                )
+        admin = User.objects.filter(role=ADMIN).first()
+        if admin is not None:
+            endpoints.append(('users-list', '/api/v1/users/'))
+        return endpoints, admin
+
+    def measure(self, client, url, repeat, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        timings.sort()
+        return {
+            'p50': statistics.median(timings),
+            'p99': percentile(timings, 0.99),
+            'mean': statistics.mean(timings),
+            'queries': len(context.captured_queries) / repeat,
+        }
+
+    def run(self, options):
+        endpoints, admin = self.get_endpoints()
+        headers = {}
+        if admin is not None:
+            token = issue_token(admin)
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        client = Client(**headers)
+        return {
+            name: self.measure(client, url, options['repeat'],
+                               options['warmup'])
+            for name, url in endpoints
+        }
+
+    def handle(self, *args, **options):
+        if options['no_cache']:
+            with override_settings(API_CACHE_TIMEOUT=0):
+                results = self.run(options)
+        else:
+            results = self.run(options)
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        self.stdout.write(
+            f'{"endpoint":<18}{"p50, ms":>10}{"p99, ms":>10}'
+            f'{"queries":>9}{"p50 vs base":>13}'
+        )
+        for name, result in results.items():
+            line = (f'{name:<18}{result["p50"]:>10.2f}{result["p99"]:>10.2f}'
+                    f'{result["queries"]:>9.1f}')
+            if name in baseline:
+                change = result['p50'] / baseline[name]['p50'] - 1
+                line += f'{change:>+13.0%}'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
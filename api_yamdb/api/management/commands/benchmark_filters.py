@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.filterset import TitleFilter
+from reviews.models import Title
+
+SCENARIOS = (
+    ('name', {'name': 'ive'}),
+    ('genre', {'genre': 'genre-3'}),
+    ('category', {'category': 'category-2'}),
+    ('year', {'year': '1999'}),
+    ('year+category', {'year': '1999', 'category': 'category-2'}),
+    ('genre+name', {'genre': 'genre-3', 'name': 'ive'}),
+)
+
+
+class Command(BaseCommand):
+    help = ('Measure TitleFilter latency on synthetic titles. '
+            'Args: [--titles <count>] [--repeat <count>] [--explain]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--explain', action='store_true',
+                            help='Print query plans of the scenarios')
+
+    def generate_titles(self, count, batch_size):
+        missing = count - Title.objects.count()
+        if missing <= 0:
+            return
+        call_command(
+            'generate_load_data', users=0, titles=missing,
+            reviews_per_title=0, comments_per_review=0,
+            batch_size=batch_size, stdout=self.stdout
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE reviews_title, reviews_genretitle')
+
+    def run_scenario(self, data):
+        queryset = TitleFilter(
+            data, queryset=Title.objects.order_by('name')
+        ).qs
+        started = time.perf_counter()
+        queryset.count()
+        list(queryset[:10])
+        return (time.perf_counter() - started) * 1000
+
+    def handle(self, *args, **options):
+        self.generate_titles(options['titles'], options['batch_size'])
+        self.stdout.write(
+            f'{"scenario":<16}{"p50, ms":>10}{"p99, ms":>10}{"max, ms":>10}'
+        )
+        for name, data in SCENARIOS:
+            timings = sorted(
+                self.run_scenario(data) for _ in range(options['repeat'])
+            )
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(
+                f'{name:<16}{statistics.median(timings):>10.1f}'
+                f'{p99:>10.1f}{timings[-1]:>10.1f}'
+            )
+            if options['explain']:
+                queryset = TitleFilter(
+                    data, queryset=Title.objects.order_by('name')
+                ).qs[:10]
+                self.stdout.write(queryset.explain())
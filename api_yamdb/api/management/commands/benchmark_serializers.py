@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from api.fast import (COMMENT_VALUES, REVIEW_VALUES, TITLE_VALUES,
+                      serialize_comments, serialize_reviews,
+                      serialize_titles)
+from api.serializers import (CommentsGetSerializer, ReviewsGetSerializer,
+                             TitleViewSerializer)
+from reviews.models import Genre, Review, Title
+
+
+class Command(BaseCommand):
+    help = ('Compare ModelSerializer and .values() fast-path rendering of '
+            'list pages. Args: [--page-size <count>] [--repeat <count>]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def get_cases(self):
+        title = Title.objects.order_by('-reviews_count', 'pk').first()
+        review = Review.objects.annotate(
+            comments_total=Count('comments')
+        ).order_by('-comments_total', 'pk').first()
+        if title is None or review is None:
+            raise CommandError(
+                'Database is empty: run generate_load_data first')
+        titles = Title.objects.order_by('name', 'id')
+        reviews = title.reviews.order_by('pub_date', 'id')
+        comments = review.comments.order_by('-pub_date', '-id')
+        genres = Prefetch('genre', queryset=Genre.objects.order_by('pk'))
+        return (
+            ('titles',
+             titles.select_related('category').prefetch_related(genres),
+             TitleViewSerializer, titles.values(*TITLE_VALUES),
+             serialize_titles),
+            ('reviews', reviews.select_related('author'),
+             ReviewsGetSerializer, reviews.values(*REVIEW_VALUES),
+             serialize_reviews),
+            ('comments', comments.select_related('author'),
+             CommentsGetSerializer, comments.values(*COMMENT_VALUES),
+             serialize_comments),
+        )
+
+    def measure(self, build, repeat):
+        renderer = JSONRenderer()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            renderer.render(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"list":<10}{"rows":>6}{"serializer, ms":>16}'
+                          f'{"fast, ms":>10}{"speedup":>9}')
+        size = options['page_size']
+        for name, queryset, serializer, rows, serialize in self.get_cases():
+            queryset, rows = queryset[:size], rows[:size]
+            slow = self.measure(
+                lambda: serializer(list(queryset.all()), many=True).data,
+                options['repeat']
+            )
+            fast = self.measure(lambda: serialize(list(rows.all())),
+                                options['repeat'])
+            self.stdout.write(
+                f'{name:<10}{len(rows):>6}{slow:>16.2f}{fast:>10.2f}'
+                f'{slow / fast:>8.1f}x'
+            )
@@ -0,0 +1,126 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_api import percentile
+
+MODES = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Compare gunicorn WSGI and uvicorn ASGI deployments with the '
+            'same worker count while slow clients hold connections open. '
+            'Args: [--workers <count>] [--slow-clients <count>] '
+            '[--requests <count>] [--concurrency <count>] [--path <url>]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--slow-clients', type=int, default=20,
+                            help='Connections that send headers slowly '
+                                 'and never finish the request')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--path', default='/api/v1/titles/')
+        parser.add_argument('--timeout', type=float, default=5,
+                            help='Client timeout of one request in seconds')
+        parser.add_argument('--modes', nargs='+', choices=MODES,
+                            default=list(MODES))
+
+    def start_server(self, mode, port, workers):
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn',
+             f'api_yamdb.{mode}:application',
+             '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, SERVER_MODE=mode),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{mode} server exited with code '
+                                   f'{server.returncode}')
+            try:
+                urlopen(f'http://127.0.0.1:{port}{self.path}', timeout=1)
+                return server
+            except (URLError, OSError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'{mode} server did not start in 30 sec')
+
+    def open_slow_clients(self, port, count):
+        clients = []
+        for _ in range(count):
+            client = socket.create_connection(('127.0.0.1', port))
+            client.sendall(f'GET {self.path} HTTP/1.1\r\n'
+                           f'Host: 127.0.0.1\r\n'.encode())
+            clients.append(client)
+        return clients
+
+    def fetch(self, url):
+        started = time.perf_counter()
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                response.read()
+        except (URLError, OSError):
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    def run_mode(self, mode, options):
+        port = free_port()
+        server = self.start_server(mode, port, options['workers'])
+        clients = []
+        try:
+            clients = self.open_slow_clients(port, options['slow_clients'])
+            url = f'http://127.0.0.1:{port}{self.path}'
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                results = list(executor.map(
+                    self.fetch, [url] * options['requests']
+                ))
+            elapsed = time.perf_counter() - started
+        finally:
+            for client in clients:
+                client.close()
+            server.terminate()
+            server.wait()
+        timings = sorted(result for result in results if result is not None)
+        return {
+            'rps': len(timings) / elapsed,
+            'p50': statistics.median(timings) if timings else None,
+            'p99': percentile(timings, 0.99) if timings else None,
+            'errors': len(results) - len(timings),
+        }
+
+    def handle(self, *args, **options):
+        self.path = options['path']
+        self.timeout = options['timeout']
+        self.stdout.write(
+            f'{"mode":<6}{"workers":>9}{"req/sec":>10}{"p50, ms":>10}'
+            f'{"p99, ms":>10}{"errors":>8}'
+        )
+        for mode in options['modes']:
+            result = self.run_mode(mode, options)
+            p50, p99 = (
+                ('-', '-') if result['p50'] is None
+                else (f'{result["p50"]:.1f}', f'{result["p99"]:.1f}')
+            )
+            self.stdout.write(
+                f'{mode:<6}{options["workers"]:>9}{result["rps"]:>10.1f}'
+                f'{p50:>10}{p99:>10}{result["errors"]:>8}'
+            )
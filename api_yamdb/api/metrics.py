@@ -0,0 +1,218 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('api.metrics')
+
+current = contextvars.ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                    10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+# Метод запроса задает клиент; остальные методы сводятся в одну серию,
+# чтобы число серий /metrics не росло от произвольных значений.
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                          'OPTIONS', 'TRACE', 'CONNECT'))
+
+HISTOGRAMS = (
+    ('api_request_duration_seconds', 'total', DURATION_BUCKETS,
+     'Time to handle the request'),
+    ('api_request_db_duration_seconds', 'db', DURATION_BUCKETS,
+     'Time spent in database queries'),
+    ('api_request_db_queries', 'queries', QUERY_BUCKETS,
+     'Number of database queries'),
+    ('api_request_serialize_duration_seconds', 'serialize',
+     DURATION_BUCKETS, 'Time spent serializing the response'),
+)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestMetrics:
+    """Счетчики одного запроса: число и время SQL-запросов (через
+    execute_wrapper) и время именованных этапов (timed)."""
+
+    __slots__ = ('queries', 'db', 'phases', 'depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+        self.depth = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def timed(phase):
+    """Прибавляет время блока к этапу текущего запроса. Вложенные блоки
+    одного этапа (сериализатор внутри сериализатора) не считаются
+    повторно."""
+    metrics = current.get()
+    if metrics is None or metrics.depth.get(phase):
+        yield
+        return
+    metrics.depth[phase] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth[phase] = 0
+        metrics.phases[phase] = (metrics.phases.get(phase, 0.0)
+                                 + time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """Время to_representation попадает в этап serialize запроса."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Гистограммы в памяти процесса по имени представления и методу.
+    Серии помечены pid воркера: при нескольких воркерах каждый сбор
+    попадает в один из них, и без метки счетчики выглядели бы
+    сбрасывающимися."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.series = {}
+
+    def observe(self, labels, values):
+        with self.lock:
+            histograms = self.series.get(labels)
+            if histograms is None:
+                histograms = self.series[labels] = [
+                    Histogram(buckets) for _, _, buckets, _ in HISTOGRAMS
+                ]
+            for histogram, (_, key, _, _) in zip(histograms, HISTOGRAMS):
+                histogram.observe(values[key])
+
+    def render(self):
+        lines = []
+        with self.lock:
+            series = sorted(self.series.items())
+            for position, (name, _, buckets, help_text) in enumerate(
+                    HISTOGRAMS):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), histograms in series:
+                    histogram = histograms[position]
+                    labels = (f'view="{view}",method="{method}",'
+                              f'worker="{os.getpid()}"')
+                    total = 0
+                    for bound, count in zip(buckets + ('+Inf',),
+                                            histogram.counts):
+                        total += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}}'
+                                     f' {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name
+
+
+def server_timing(values):
+    return ', '.join((
+        f'db;dur={values["db"] * 1000:.1f};desc="{values["queries"]} '
+        f'queries"',
+        f'serialize;dur={values["serialize"] * 1000:.1f}',
+        f'total;dur={values["total"] * 1000:.1f}',
+    ))
+
+
+class MetricsMiddleware:
+    """Для каждого запроса считает полное время, число и время запросов
+    к БД и время сериализации. Отдает их в заголовке Server-Timing,
+    пишет строкой JSON в лог api.metrics и копит гистограммы для
+    /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.API_METRICS:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        values = {
+            'total': time.perf_counter() - started,
+            'db': metrics.db,
+            'queries': metrics.queries,
+            'serialize': metrics.phases.get('serialize', 0.0),
+        }
+        view = view_name(request)
+        response['Server-Timing'] = server_timing(values)
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        registry.observe((view, method), values)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view, 'method': request.method,
+                'path': request.path, 'status': response.status_code,
+                'total_ms': round(values['total'] * 1000, 2),
+                'db_ms': round(values['db'] * 1000, 2),
+                'queries': values['queries'],
+                'serialize_ms': round(values['serialize'] * 1000, 2),
+            }, ensure_ascii=False))
+        return response
+
+
+def metrics_view(request):
+    """Гистограммы в текстовом формате Prometheus по заголовку
+    Authorization: Bearer <METRICS_TOKEN>; без METRICS_TOKEN закрыты."""
+    token = settings.METRICS_TOKEN
+    if not token or not constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type=PROMETHEUS_CONTENT_TYPE)
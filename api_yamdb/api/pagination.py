@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Постраничный вывод по номеру страницы, а при наличии параметра
+    `cursor` — по ключу сортировки без OFFSET и COUNT(*)."""
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+    ordering_with_cursor_message = (
+        'Курсорная пагинация не поддерживает параметр сортировки.'
+    )
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.check_ordering(request, view)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position))
+            except (TypeError, ValueError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def check_ordering(self, request, view):
+        """Курсор строится по фиксированному ключу self.ordering, поэтому
+        `?ordering=` вместе с `cursor` отклоняется: иначе страницы шли бы
+        в другом порядке, чем запрошено."""
+        for backend in getattr(view, 'filter_backends', ()):
+            if (issubclass(backend, OrderingFilter)
+                    and request.query_params.get(backend.ordering_param)):
+                raise ValidationError({
+                    backend.ordering_param: [
+                        self.ordering_with_cursor_message
+                    ]
+                })
+
+    def after(self, position):
+        """Условие «строго после» для составного ключа сортировки."""
+        condition = Q()
+        equal = {}
+        for ordering, value in zip(self.ordering, position):
+            field = ordering.lstrip('-')
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def encode_cursor(self, obj):
+        position = []
+        for ordering in self.ordering:
+            field = ordering.lstrip('-')
+            if isinstance(obj, dict):
+                value = obj[field]
+            else:
+                value = getattr(obj, field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        data = json.dumps(position).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class TitlePagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ('pub_date', 'id')
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
@@ -7,7 +7,7 @@ class OnlyOwnerCanEdit(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         return bool(request.user and request.user.is_authenticated
-                    and obj.author == request.user)
+                    and obj.author_id == request.user.pk)
 
 
 class IsModerator(BasePermission):
@@ -0,0 +1,253 @@
+import cProfile
+import io
+import json
+import marshal
+import math
+import sys
+import threading
+import time
+import zipfile
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .permissions import IsAdmin
+from .throttling import get_store, parse_rate
+
+PSTATS = 'pstats'
+SPEEDSCOPE = 'speedscope'
+PROFILE_KINDS = {'1': PSTATS, PSTATS: PSTATS, SPEEDSCOPE: SPEEDSCOPE}
+
+THROTTLE_SCOPE = 'profile'
+THROTTLE_KEY = 'throttle:profile'
+# В архив попадают не больше MAX_QUERIES запросов к БД.
+MAX_QUERIES = 1000
+
+
+def profile_kind(request):
+    value = request.GET.get('profile') or request.META.get('HTTP_X_PROFILE')
+    return PROFILE_KINDS.get((value or '').lower())
+
+
+class ProfilerBusy(Exception):
+    """Процесс уже выполняет другой профиль speedscope."""
+
+
+def get_admin(request):
+    """Проверяет токен запроса теми же классами аутентификации, что и
+    DRF, до того как запрос дойдет до представления. Возвращает
+    администратора или None."""
+    drf_request = Request(request, authenticators=[
+        authentication() for authentication
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        if IsAdmin().has_permission(drf_request, None):
+            return drf_request.user
+    except APIException:
+        pass
+    return None
+
+
+def throttle_wait(user):
+    rate = api_settings.DEFAULT_THROTTLE_RATES.get(THROTTLE_SCOPE)
+    if not rate:
+        return 0
+    capacity, interval = parse_rate(rate)
+    return get_store().consume(f'{THROTTLE_KEY}:{user.pk}', capacity,
+                               interval)
+
+
+def too_many_requests(message, wait):
+    response = JsonResponse({'detail': message}, status=429,
+                            json_dumps_params={'ensure_ascii': False})
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+class QueryLog:
+    """Запросы к БД с их временем: execute_wrapper для всех соединений."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if len(self.queries) < MAX_QUERIES:
+                connection = context['connection']
+                self.queries.append({
+                    'alias': connection.alias,
+                    'sql': connection.ops.last_executed_query(
+                        context['cursor'], sql, params
+                    ),
+                    'many': many,
+                    'duration_ms': round(duration * 1000, 3),
+                })
+
+
+class DeterministicProfiler:
+    """cProfile: каждый вызов функции, файл для pstats и snakeviz."""
+
+    filename = 'profile.prof'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def dump(self, name):
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+
+class SamplingProfiler:
+    """Отдельный поток раз в interval секунд снимает стек потока запроса.
+    Накладные расходы не зависят от числа вызовов; результат в формате
+    speedscope (https://www.speedscope.app). Поток сэмплера получает GIL
+    не чаще sys.getswitchinterval() (5 мс), поэтому на время профиля
+    интервал переключения уменьшается до interval. Он общий для процесса,
+    и одновременно идет не больше одного такого профиля: иначе
+    закончившийся первым профиль вернул бы интервал, сохраненный вторым,
+    то есть уменьшенный."""
+
+    filename = 'profile.speedscope.json'
+    running = threading.Lock()
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILER_SAMPLE_INTERVAL
+        self.thread_id = threading.get_ident()
+        self.frames = {}
+        self.samples = []
+        self.weights = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        if not self.running.acquire(blocking=False):
+            raise ProfilerBusy()
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, self.interval))
+        self.started = self.last = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.finished = time.perf_counter()
+        sys.setswitchinterval(self.switch_interval)
+        self.running.release()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            stack.append(self.frames.setdefault(key, len(self.frames)))
+            frame = frame.f_back
+        now = time.perf_counter()
+        self.samples.append(stack[::-1])
+        self.weights.append(now - self.last)
+        self.last = now
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def dump(self, name):
+        return json.dumps({
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'api_yamdb',
+            'shared': {'frames': [
+                {'name': function, 'file': filename, 'line': line}
+                for function, filename, line in self.frames
+            ]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.finished - self.started,
+                'samples': self.samples,
+                'weights': self.weights,
+            }],
+        }).encode()
+
+
+PROFILERS = {PSTATS: DeterministicProfiler, SPEEDSCOPE: SamplingProfiler}
+
+
+class ProfilerMiddleware:
+    """По ?profile=pstats|speedscope или заголовку X-Profile выполняет
+    запрос администратора под профилировщиком и вместо ответа отдает zip
+    с профилем и выполненными запросами к БД. Профилирование ограничено
+    корзиной токенов 'profile' (DEFAULT_THROTTLE_RATES) каждого
+    администратора; запросы остальных пользователей с этим флагом
+    обрабатываются как обычно."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        kind = profile_kind(request) if settings.API_PROFILER else None
+        user = get_admin(request) if kind else None
+        if user is None:
+            return self.get_response(request)
+        wait = throttle_wait(user)
+        if wait:
+            return too_many_requests(
+                'Превышен лимит профилирования запросов', wait)
+        try:
+            return self.profile(request, PROFILERS[kind]())
+        except ProfilerBusy:
+            return too_many_requests(
+                'Процесс уже выполняет другой профиль speedscope', 1)
+
+    def profile(self, request, profiler):
+        # Ответы из кэша не показали бы, где тратится время.
+        request.profiling = True
+        queries = QueryLog()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            profiler.start()
+            try:
+                response = self.get_response(request)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+            finally:
+                profiler.stop()
+        duration = time.perf_counter() - started
+        name = f'{request.method} {request.get_full_path()}'
+        summary = {
+            'request': name,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'queries': queries.queries,
+        }
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipped:
+            zipped.writestr(profiler.filename, profiler.dump(name))
+            zipped.writestr('queries.json', json.dumps(
+                summary, ensure_ascii=False, indent=2, default=str
+            ))
+        result = HttpResponse(archive.getvalue(),
+                              content_type='application/zip')
+        result['Content-Disposition'] = 'attachment; filename="profile.zip"'
+        result['X-Profile-Status'] = str(response.status_code)
+        return result
@@ -0,0 +1,148 @@
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+current = contextvars.ContextVar('replica_routing', default=None)
+
+POSITION_SQL = (
+    "SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() "
+    "ELSE pg_current_wal_lsn() END - '0/0'::pg_lsn"
+)
+# Последние известные позиции реплик процесса. Позиция реплики только
+# растет, поэтому догнавшую реплику не нужно опрашивать снова.
+replayed = {}
+
+
+class Routing:
+    """Куда читает текущий запрос: alias реплики или None (основная БД)."""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def client_key(request):
+    """Хэш учетных данных клиента (JWT или сессии) для окна
+    read-your-writes; у анонимных клиентов его нет."""
+    credentials = (request.META.get('HTTP_AUTHORIZATION')
+                   or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if not credentials:
+        return None
+    return hashlib.md5(credentials.encode()).hexdigest()
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def pin_key(client):
+    return f'replica:pinned:{client}'
+
+
+def wal_position(alias):
+    """Позиция журнала PostgreSQL, до которой дошла БД: на основной —
+    записанная, на реплике — примененная. None для других СУБД."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(POSITION_SQL)
+        position = cursor.fetchone()[0]
+    return None if position is None else int(position)
+
+
+def is_fresh(position, required):
+    """Данные, прочитанные на позиции position, учитывают все записи до
+    позиции required (None — таких записей не известно)."""
+    return required is None or (position is not None
+                                and position >= required)
+
+
+def use_fresh_replica(required):
+    """Оставляет запрос читать из реплики, только если она применила
+    журнал основной БД до позиции required; иначе остаток запроса
+    читает из основной БД. Реплика, позицию которой не узнать, тоже не
+    используется."""
+    routing = current.get()
+    if routing is None or routing.replica is None:
+        return
+    position = replayed.get(routing.replica)
+    if position is None or not is_fresh(position, required):
+        position = wal_position(routing.replica)
+        if position is not None:
+            replayed[routing.replica] = position
+    if position is None or not is_fresh(position, required):
+        routing.replica = None
+
+
+def read_position():
+    """Позиция БД, из которой читает запрос; у реплики — проверенная
+    use_fresh_replica, без запроса к ней."""
+    routing = current.get()
+    if routing is not None and routing.replica is not None:
+        return replayed.get(routing.replica)
+    return wal_position(DEFAULT_DB_ALIAS)
+
+
+class ReplicaMiddleware:
+    """Запросы GET, HEAD и OPTIONS читают из случайной реплики из
+    DATABASE_REPLICAS, остальные работают только с основной БД. Клиент,
+    который что-то записал, следующие REPLICA_PIN_SECONDS секунд читает
+    из основной БД, чтобы сразу видеть свои изменения."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return self.get_response(request)
+        client = client_key(request)
+        replica = None
+        if request.method in SAFE_METHODS and not (
+                client and get_cache().get(pin_key(client))):
+            replica = random.choice(replicas)
+        routing = Routing(replica)
+        token = current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if routing.wrote and client:
+            get_cache().set(pin_key(client), True,
+                            settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+class ReplicaRouter:
+    """Чтения запроса идут в реплику, выбранную ReplicaMiddleware;
+    первая запись переключает остаток запроса на основную БД. Вне
+    запросов (команды, сигналы после ответа) все идет в основную БД."""
+
+    def db_for_read(self, model, **hints):
+        routing = current.get()
+        if routing is None:
+            return None
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплик меняет репликация с основной БД.
+        return db == DEFAULT_DB_ALIAS
@@ -3,12 +3,32 @@ from datetime import date
 from django.contrib.auth import get_user_model
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
+from rest_framework.exceptions import APIException
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (Category, Comment, Genre, Review, SignupConflict,
+                            SignupRetriesExhausted, Title)
+from reviews.search import COMMENT, REVIEW, SEARCH_FIELDS, TITLE
+from .metrics import TimedSerializerMixin
 
 User = get_user_model()
 
 
+REVIEW_EXISTS = 'Вы уже оставили отзыв на данное произведение'
+
+SIGNUP_CONFLICTS = {
+    'email': 'Email уже используется',
+    'username': 'Username уже используется',
+}
+
+
+class SignupUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Не удалось завершить регистрацию, повторите запрос'
+    default_code = 'signup_unavailable'
+
+
 class UserSignupSerializer(serializers.Serializer):
     email = serializers.EmailField(max_length=254, allow_blank=False)
     username = serializers.CharField(max_length=150, allow_blank=False,
@@ -21,21 +41,17 @@ class UserSignupSerializer(serializers.Serializer):
             )
         return value
 
-    def validate(self, attrs):
-        super().validate(attrs)
-        user = attrs['username']
-        email = attrs['email']
-        if User.objects.filter(email=email, username=user).exists():
-            return attrs
-        if User.objects.filter(email=email).exists():
-            raise serializers.ValidationError(
-                'Email уже используется'
-            )
-        if User.objects.filter(username=user).exists():
+    def create(self, validated_data):
+        try:
+            user, created = User.objects.signup(**validated_data)
+        except SignupConflict as conflict:
+            message = SIGNUP_CONFLICTS[conflict.field]
             raise serializers.ValidationError(
-                'Username уже используется'
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]}
             )
-        return attrs
+        except SignupRetriesExhausted:
+            raise SignupUnavailable()
+        return user
 
 
 class TokenObtainSerializer(serializers.Serializer):
@@ -43,7 +59,7 @@ class TokenObtainSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(max_length=200, required=True)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
@@ -59,7 +75,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return value
 
 
-class AdminUsersSerializer(serializers.ModelSerializer):
+class AdminUsersSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
@@ -76,7 +92,7 @@ class AdminUsersSerializer(serializers.ModelSerializer):
         return value
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Category
@@ -87,7 +103,7 @@ class CategorySerializer(serializers.ModelSerializer):
         return category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Genre
@@ -98,7 +114,7 @@ class GenreSerializer(serializers.ModelSerializer):
         return genre
 
 
-class TitleCreateSerializer(serializers.ModelSerializer):
+class TitleCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(many=True, write_only=True,
                                          slug_field='slug', required=False,
                                          queryset=Genre.objects.all())
@@ -118,10 +134,46 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleViewSerializer(serializers.ModelSerializer):
+class ClassificationBulkSerializer(serializers.Serializer):
+    """Категория или жанр из пакета: уникальность имени и слага
+    проверяется сразу для всего пакета (api/bulk.py)."""
+
+    name = serializers.CharField(max_length=256)
+    slug = serializers.SlugField(max_length=50)
+
+
+class TitleBulkSerializer(TitleCreateSerializer):
+    """Произведение из пакета: слаги ищутся в словарях context['genres']
+    и context['categories'], собранных для всего пакета."""
+
+    genre = serializers.ListField(child=serializers.SlugField(),
+                                  required=False)
+    category = serializers.SlugField(required=False)
+
+    def slug_error(self, value):
+        message = serializers.SlugRelatedField.default_error_messages[
+            'does_not_exist']
+        return serializers.ValidationError(
+            message.format(slug_name='slug', value=value)
+        )
+
+    def validate_genre(self, value):
+        genres = self.context['genres']
+        for slug in value:
+            if slug not in genres:
+                raise self.slug_error(slug)
+        return list(dict.fromkeys(genres[slug] for slug in value))
+
+    def validate_category(self, value):
+        if value not in self.context['categories']:
+            raise self.slug_error(value)
+        return self.context['categories'][value]
+
+
+class TitleViewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(many=False, required=False)
     genre = GenreSerializer(many=True, required=False)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -130,7 +182,7 @@ class TitleViewSerializer(serializers.ModelSerializer):
         read_only_fields = ('genre', 'category', 'rating')
 
 
-class ReviewsGetSerializer(serializers.ModelSerializer):
+class ReviewsGetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
@@ -138,27 +190,47 @@ class ReviewsGetSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
 
-    def validate(self, data):
-        request = self.context['request']
-
-        if request.method != 'POST':
-            return data
-
-        user = request.user
-        title_id = (
-            request.parser_context['kwargs']['title_id']
-        )
-        if Review.objects.filter(author=user, title=title_id).exists():
-            raise serializers.ValidationError(
-                'Вы уже оставили отзыв на данное произведение'
-            )
-        return data
-
 
-class CommentsGetSerializer(serializers.ModelSerializer):
+class CommentsGetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
     class Meta:
         model = Comment
         fields = ['id', 'text', 'author', 'pub_date']
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    type = serializers.MultipleChoiceField(choices=tuple(SEARCH_FIELDS),
+                                           required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class SearchResultSerializer(TimedSerializerMixin, serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    rank = serializers.FloatField()
+    text = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    def get_text(self, obj):
+        if obj['type'] == TITLE:
+            return obj['name']
+        return obj['text']
+
+    def get_url(self, obj):
+        request = self.context['request']
+        if obj['type'] == TITLE:
+            return reverse('title-detail', kwargs={'pk': obj['id']},
+                           request=request)
+        if obj['type'] == REVIEW:
+            return reverse('reviews-detail', kwargs={
+                'title_id': obj['title_id'], 'pk': obj['id']
+            }, request=request)
+        if obj['type'] == COMMENT:
+            return reverse('comments-detail', kwargs={
+                'title_id': obj['review__title_id'],
+                'review_id': obj['review_id'], 'pk': obj['id']
+            }, request=request)
+        return None
@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Category, Genre, GenreTitle, Review, Title, User
+from .authentication import REVOKED, remember_token_version
+from .cache import (CATALOGUE, CATEGORIES, GENRES, TITLES, invalidate,
+                    title_scope)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate(CATEGORIES, CATALOGUE)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    invalidate(GENRES, CATALOGUE)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    invalidate(TITLES, title_scope(instance.pk))
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def title_relation_changed(sender, instance, **kwargs):
+    invalidate(TITLES, title_scope(instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate(TITLES, title_scope(instance.pk))
+    elif pk_set:
+        invalidate(TITLES, *(title_scope(pk) for pk in pk_set))
+    else:
+        invalidate(CATALOGUE)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    version = instance.token_version if instance.is_active else REVOKED
+    remember_token_version(instance.pk, version)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    remember_token_version(instance.pk, REVOKED)
@@ -0,0 +1,186 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/hour' -> (5, 3600): емкость корзины и время ее наполнения."""
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+
+def take_token(state, capacity, interval, now):
+    """Пополняет корзину за прошедшее время и забирает из нее токен.
+    Возвращает новое состояние и сколько секунд ждать, если токена нет."""
+    rate = capacity / interval
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0, now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса: подходит для одного процесса."""
+
+    max_keys = 100000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def prune(self, now):
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if now - bucket[1] < bucket[2]
+        }
+
+    def consume(self, key, capacity, interval, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if len(self.buckets) >= self.max_keys:
+                self.prune(now)
+            bucket = self.buckets.get(key)
+            state, wait = take_token(bucket and bucket[:2], capacity,
+                                     interval, now)
+            self.buckets[key] = (*state, interval)
+        return wait
+
+
+class CacheBucketStore:
+    """Корзины в кэше Django, общем для процессов. Чтение и запись не
+    атомарны: при гонке лимит может быть превышен на несколько запросов."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.API_CACHE_ALIAS]
+
+    def consume(self, key, capacity, interval, now=None):
+        now = time.time() if now is None else now
+        state, wait = take_token(self.cache.get(key), capacity, interval,
+                                 now)
+        self.cache.set(key, state, interval)
+        return wait
+
+
+class RedisBucketStore:
+    """Корзины в Redis, обновляемые атомарно скриптом Lua."""
+
+    script = """
+        local capacity = tonumber(ARGV[1])
+        local interval = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local rate = capacity / interval
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(capacity,
+                          tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / rate
+        end
+        redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens),
+                   'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(interval))
+        return tostring(wait)
+    """
+
+    def __init__(self, alias=None):
+        from django_redis import get_redis_connection
+
+        client = get_redis_connection(alias or settings.API_CACHE_ALIAS)
+        self.consume_script = client.register_script(self.script)
+
+    def consume(self, key, capacity, interval, now=None):
+        now = time.time() if now is None else now
+        return float(self.consume_script(keys=[key],
+                                         args=[capacity, interval, now]))
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.AUTH_THROTTLE_STORE)()
+    return _store
+
+
+def reset_store():
+    global _store
+    _store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничивает запросы по корзине токенов: в ней до N токенов для
+    скорости 'N/период', и она равномерно пополняется за период."""
+
+    scope = None
+
+    def __init_subclass__(cls, **kwargs):
+        # get_ident_key(request) возвращает то, по чему делятся корзины;
+        # без него подкласс не создается, а не падает на первом запросе.
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'get_ident_key', None)):
+            raise TypeError(
+                f'{cls.__name__} must define get_ident_key(request)')
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return True
+        ident = self.get_ident_key(request)
+        if not ident:
+            return True
+        ident = hashlib.md5(str(ident).encode()).hexdigest()
+        capacity, interval = parse_rate(rate)
+        self.wait_seconds = get_store().consume(
+            f'throttle:{self.scope}:{ident}', capacity, interval
+        )
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(TokenBucketThrottle):
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+
+    def get_ident_key(self, request):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if isinstance(username, str):
+            return username.strip().lower()
+        return None
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class SignupUsernameThrottle(UsernameThrottle):
+    scope = 'signup_username'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token_ip'
+
+
+class TokenUsernameThrottle(UsernameThrottle):
+    scope = 'token_username'
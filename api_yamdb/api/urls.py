@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (AdminUsersViewSet, CategoryViewSet, CommentViewSet,
                     GenreViewSet, ReviewViewSet, TitleViewSet,
-                    UserProfileViewSet, signup_view, token_obtain_view)
+                    UserProfileViewSet, search_view, signup_view,
+                    token_obtain_view)
 
 router = DefaultRouter()
 router.register('users', AdminUsersViewSet)
@@ -20,6 +21,7 @@ router.register('titles', TitleViewSet)
 urlpatterns = [
     path('v1/auth/signup/', signup_view, name='user_signup'),
     path('v1/auth/token/', token_obtain_view, name='token_obtain'),
+    path('v1/search/', search_view, name='search'),
     path('v1/users/me/',
          UserProfileViewSet.as_view({'get': 'retrieve', 'patch': 'update'}),
          name='user_profile'),
@@ -1,42 +1,77 @@
-from django.db.models.aggregates import Avg
 from api_yamdb.settings import NO_REPLY_EMAIL
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.mail import send_mail
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes, throttle_classes)
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
-from rest_framework_simplejwt.tokens import AccessToken
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (Category, Comment, Genre, OutgoingEmail, Review,
+                            Title)
+from reviews.search import SEARCH_FIELDS, search
+from reviews.summary import catalogue_stats, title_stats
+from .authentication import ClaimsUser, issue_token
+from .bulk import (BulkCreateMixin, bulk_response, check_batch,
+                   create_classifications, create_titles, update_titles)
+from .cache import (CATALOGUE, CATEGORIES, GENRES, TITLES,
+                    CachedResponseMixin, invalidate, title_scope)
+from .conditional import ConditionalGetMixin
+from .fast import (COMMENT_VALUES, REVIEW_VALUES, TITLE_VALUES,
+                   FastListMixin, serialize_comments, serialize_reviews,
+                   serialize_titles)
 from .filterset import TitleFilter
+from .pagination import CommentPagination, ReviewPagination, TitlePagination
 from .permissions import (IsAdmin, IsAdminOrReadOnly, IsModerator,
                           OnlyOwnerCanEdit)
-from .serializers import (AdminUsersSerializer, CategorySerializer,
-                          CommentsGetSerializer, GenreSerializer,
-                          ReviewsGetSerializer, TitleCreateSerializer,
+from .serializers import (REVIEW_EXISTS, AdminUsersSerializer,
+                          CategorySerializer, CommentsGetSerializer,
+                          GenreSerializer,
+                          ReviewsGetSerializer, SearchQuerySerializer,
+                          SearchResultSerializer, TitleCreateSerializer,
                           TitleViewSerializer, TokenObtainSerializer,
                           UserProfileSerializer, UserSignupSerializer)
+from .throttling import (SignupIPThrottle, SignupUsernameThrottle,
+                         TokenIPThrottle, TokenUsernameThrottle)
 
 User = get_user_model()
 
 
 @api_view(['POST'])
+@authentication_classes(())
 @permission_classes((AllowAny,))
+@throttle_classes((SignupIPThrottle, SignupUsernameThrottle))
 def signup_view(request):
 
     def confirmation_code_send(user_email, confirmation_code):
 
         letter_body = 'Confirmation code: ' + confirmation_code
+        subject = 'Подтверждение регистрации на YaMBD'
+
+        if settings.EMAIL_OUTBOX:
+            OutgoingEmail.objects.create(
+                subject=subject,
+                body=letter_body,
+                from_email=NO_REPLY_EMAIL,
+                recipient=user_email,
+            )
+            return confirmation_code
 
         send_mail(
-            'Подтверждение регистрации на YaMBD',
+            subject,
             letter_body,
             NO_REPLY_EMAIL,
             [user_email],
@@ -50,21 +85,22 @@ def signup_view(request):
 
     serializer = UserSignupSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    email = serializer.validated_data['email']
-    username = serializer.validated_data['username']
-    user, st = User.objects.get_or_create(email=email, username=username)
+    user = serializer.save()
     if user.confirmation_code is None:
-        code = confirmation_code_generation(user)
-        user.confirmation_code = code
-        user.save()
+        user.confirmation_code = confirmation_code_generation(user)
+        User.objects.filter(
+            pk=user.pk, confirmation_code__isnull=True
+        ).update(confirmation_code=user.confirmation_code)
 
-    confirmation_code_send(email, user.confirmation_code)
+    confirmation_code_send(user.email, user.confirmation_code)
 
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
+@authentication_classes(())
 @permission_classes((AllowAny,))
+@throttle_classes((TokenIPThrottle, TokenUsernameThrottle))
 def token_obtain_view(request):
     serializer = TokenObtainSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -72,8 +108,7 @@ def token_obtain_view(request):
     code = serializer.validated_data['confirmation_code']
     user = get_object_or_404(User, username=username)
     if PasswordResetTokenGenerator().check_token(user, code):
-        token = AccessToken().for_user(user)
-        print(token)
+        token = issue_token(user)
         context = {'token': str(token)}
         return Response(context, status=status.HTTP_200_OK)
     error_context = {
@@ -81,6 +116,23 @@ def token_obtain_view(request):
     return Response(error_context, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def search_view(request):
+    serializer = SearchQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    results = search(
+        serializer.validated_data['q'],
+        kinds=serializer.validated_data.get('type') or tuple(SEARCH_FIELDS),
+        limit=serializer.validated_data['limit'],
+    )
+    context = {'request': request}
+    return Response(
+        SearchResultSerializer(results, many=True, context=context).data,
+        status=status.HTTP_200_OK
+    )
+
+
 class UserProfileViewSet(mixins.RetrieveModelMixin,
                          mixins.UpdateModelMixin,
                          GenericViewSet):
@@ -90,7 +142,7 @@ class UserProfileViewSet(mixins.RetrieveModelMixin,
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        user = get_object_or_404(User, username=self.request.user)
+        user = get_object_or_404(User, pk=self.request.user.pk)
         return user
 
 
@@ -106,7 +158,8 @@ class AdminUsersViewSet(ModelViewSet):
     search_fields = ('username',)
 
 
-class ClassificationViewSet(mixins.CreateModelMixin,
+class ClassificationViewSet(BulkCreateMixin,
+                            mixins.CreateModelMixin,
                             mixins.DestroyModelMixin,
                             mixins.ListModelMixin,
                             GenericViewSet):
@@ -117,62 +170,183 @@ class ClassificationViewSet(mixins.CreateModelMixin,
     ordering = ('name',)
     search_fields = ('name',)
 
+    def bulk_create(self, items):
+        results, errors = create_classifications(self.queryset.model, items)
+        if results:
+            invalidate(*self.cache_scopes, CATALOGUE)
+        return results, errors
+
 
-class CategoryViewSet(ClassificationViewSet):
+class CategoryViewSet(CachedResponseMixin, ClassificationViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_scopes = (CATEGORIES,)
 
 
-class GenreViewSet(ClassificationViewSet):
+class GenreViewSet(CachedResponseMixin, ClassificationViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_scopes = (GENRES,)
 
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
+class TitleViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin,
+                   BulkCreateMixin, ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by('pk'))
+    )
     permission_classes = (IsAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
     filter_backends = (OrderingFilter, DjangoFilterBackend)
     ordering = ('name',)
     filterset_class = TitleFilter
+    pagination_class = TitlePagination
+    cache_scopes = (CATALOGUE, TITLES)
+    fast_values = TITLE_VALUES
+    fast_serializer = staticmethod(serialize_titles)
+
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return (CATALOGUE, title_scope(self.kwargs['pk']))
+        return self.cache_scopes
+
+    def get_version(self):
+        if self.action != 'retrieve':
+            return None
+        return Title.objects.filter(pk=self.kwargs['pk']).values_list(
+            'version', 'modified').first()
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleViewSerializer
         return TitleCreateSerializer
 
+    def bulk_create(self, items):
+        results, errors = create_titles(items)
+        if results:
+            invalidate(TITLES)
+        return results, errors
+
+    @action(detail=False, methods=['patch'], url_path='bulk',
+            url_name='bulk')
+    def bulk_update(self, request):
+        check_batch(request.data)
+        results, errors = update_titles(request.data)
+        invalidate(TITLES, *(title_scope(row['id']) for row in results))
+        return bulk_response(results, errors, status.HTTP_200_OK)
+
+    @action(detail=False, url_path='stats', url_name='catalogue-stats')
+    def catalogue_stats(self, request):
+        return Response(catalogue_stats())
+
+    @action(detail=True, url_path='stats', url_name='stats')
+    def stats(self, request, pk=None):
+        title_id = get_object_or_404(
+            Title.objects.values_list('pk', flat=True), pk=pk
+        )
+        return Response({'id': title_id, **title_stats(title_id)})
+
 
-class ReviewViewSet(ModelViewSet):
+def parent_version(parents):
+    """Версия родителя вложенного маршрута; этот же запрос отвечает 404,
+    если родителя нет, и другие выборки родителя не нужны."""
+    version = parents.values_list('version', 'modified').first()
+    if version is None:
+        raise Http404
+    return version
+
+
+def request_author(request):
+    user = request.user
+    return user.as_author() if isinstance(user, ClaimsUser) else user
+
+
+def save_child(serializer, parents, verified=False, **fields):
+    """Сохраняет отзыв или комментарий без предварительной выборки
+    родителя: его наличие проверяет внешний ключ, повтор отзыва —
+    ограничение уникальности. Возвращает False при нарушении
+    уникальности и отвечает 404, если родителя нет.
+
+    Внешние ключи проверяются при COMMIT, поэтому внутри уже открытой
+    транзакции родитель проверяется заранее, если это еще не сделано
+    (verified)."""
+    if not verified and connection.in_atomic_block and not parents.exists():
+        raise Http404
+    try:
+        with transaction.atomic():
+            serializer.save(**fields)
+    except IntegrityError:
+        if not parents.exists():
+            raise Http404
+        return False
+    return True
+
+
+class ReviewViewSet(ConditionalGetMixin, FastListMixin, ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewsGetSerializer
     permission_classes = [IsAuthenticatedOrReadOnly,
                           OnlyOwnerCanEdit | IsAdmin | IsModerator]
+    pagination_class = ReviewPagination
+    fast_values = REVIEW_VALUES
+    fast_serializer = staticmethod(serialize_reviews)
+
+    def get_version(self):
+        if self.action == 'retrieve':
+            return Review.objects.filter(
+                pk=self.kwargs['pk'], title_id=self.kwargs['title_id']
+            ).values_list('version', 'modified').first()
+        return parent_version(Title.objects.filter(
+            pk=self.kwargs['title_id']))
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        reviews = title.reviews.all()
-        return reviews
+        return Review.objects.filter(
+            title_id=self.kwargs['title_id']
+        ).select_related('author')
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        titles = Title.objects.filter(pk=self.kwargs['title_id'])
+        created = save_child(serializer, titles,
+                             author=request_author(self.request),
+                             title_id=self.kwargs['title_id'])
+        if not created:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_EXISTS]})
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, FastListMixin, ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentsGetSerializer
     permission_classes = [IsAuthenticatedOrReadOnly,
                           OnlyOwnerCanEdit | IsAdmin | IsModerator]
+    pagination_class = CommentPagination
+    fast_values = COMMENT_VALUES
+    fast_serializer = staticmethod(serialize_comments)
+
+    def get_reviews(self):
+        return Review.objects.filter(pk=self.kwargs['review_id'],
+                                     title_id=self.kwargs['title_id'])
+
+    def get_version(self):
+        return parent_version(self.get_reviews())
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'),
-                                   title=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, review=review)
+        # Внешний ключ не проверяет, что отзыв относится к произведению из
+        # адреса, поэтому отзыв выбирается, но один раз.
+        reviews = self.get_reviews()
+        if not reviews.exists():
+            raise Http404
+        save_child(serializer, reviews, verified=True,
+                   author=request_author(self.request),
+                   review_id=self.kwargs['review_id'])
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'),
-                                   title=self.kwargs.get('title_id'))
-        comments = review.comments.all()
+        comments = Comment.objects.filter(
+            review_id=self.kwargs['review_id']
+        ).select_related('author')
+        if self.action != 'list':
+            # Для списка отзыв уже проверен в get_version.
+            comments = comments.filter(review__title_id=self.kwargs[
+                'title_id'])
         return comments
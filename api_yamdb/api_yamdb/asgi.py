@@ -1,7 +1,54 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+# В Django 2.2 нет ASGI-обработчика и асинхронного ORM: приложение
+# выполняется в пуле потоков, а чтение запросов и отправку ответов
+# медленным клиентам берет на себя цикл событий ASGI-сервера.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASGI_THREADS', default=32))
+)
+
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    # asgiref по умолчанию запускает WSGI-приложение в одном общем потоке
+    # (thread_sensitive), и запросы процесса выполнялись бы по одному.
+    # Исходная функция берется из внутренностей asgiref, поэтому его версия
+    # закреплена в requirements.txt, а форму атрибута проверяет test_asgi.
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__['run_wsgi_app'].func,
+        thread_sensitive=False, executor=executor
+    )
+
+
+def closing(wsgi_application):
+    """asgiref не вызывает close() у ответа, а по нему Django шлет
+    request_finished и закрывает соединения с БД потока."""
+
+    def application(environ, start_response):
+        response = wsgi_application(environ, start_response)
+        try:
+            return list(response)
+        finally:
+            response.close()
+
+    return application
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+
+    def __init__(self, wsgi_application):
+        super().__init__(closing(wsgi_application))
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application)(
+            scope, receive, send
+        )
+
+
+application = ThreadPoolWsgiToAsgi(get_wsgi_application())
@@ -0,0 +1,39 @@
+from functools import partial
+
+from django.db.backends.postgresql import base, creation
+
+from .pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Свободные соединения пула помешали бы DROP DATABASE.
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд PostgreSQL, который берет соединения из пула процесса
+    (pool.ConnectionPool) и возвращает их туда при закрытии. Параметры
+    пула задаются в settings_dict['POOL']; CONN_MAX_AGE должен быть 0,
+    чтобы поток отдавал соединение в пул в конце каждого запроса."""
+
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        connect = partial(super().get_new_connection, conn_params)
+        options = {key.lower(): value for key, value
+                   in self.settings_dict.get('POOL', {}).items()}
+        self.pool = get_pool(tuple(sorted(conn_params.items())), connect,
+                             **options)
+        connection = self.pool.checkout(connect)
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.checkin(self.connection)
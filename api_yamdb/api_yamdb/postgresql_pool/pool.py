@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INERROR,
+                                 TRANSACTION_STATUS_INTRANS)
+
+
+class PoolTimeout(OperationalError):
+    """Свободное соединение не появилось за timeout секунд. Наследуется
+    от OperationalError psycopg2, поэтому Django оборачивает его в
+    django.db.OperationalError."""
+
+
+def discard(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def is_alive(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Соединения psycopg2 одного процесса, общие для всех его потоков.
+
+    Открыто не больше max_size соединений; поток, которому не хватило
+    соединения, ждет до timeout секунд. Соединение, простоявшее без дела
+    дольше health_check_after секунд, перед выдачей проверяется
+    запросом SELECT 1; простоявшие дольше max_idle секунд закрывает
+    фоновый поток. В пул возвращаются только соединения вне транзакции,
+    остальные откатываются или закрываются."""
+
+    def __init__(self, connect, max_size=10, timeout=30, max_idle=300,
+                 health_check_after=5):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.condition = threading.Condition()
+        # Свободные соединения и время их возврата; выдаются с конца,
+        # чтобы редко нужные соединения дольше простаивали и закрывались.
+        self.idle = deque()
+        self.size = 0
+        self.closed = False
+        self.reaper = None
+
+    def checkout(self, connect=None):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                if self.closed:
+                    raise OperationalError('Пул соединений закрыт')
+                if self.idle:
+                    connection, returned = self.idle.pop()
+                elif self.size < self.max_size:
+                    self.size += 1
+                    connection = None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f'Все {self.max_size} соединений пула заняты '
+                            f'дольше {self.timeout} с'
+                        )
+                    self.condition.wait(remaining)
+                    continue
+            if connection is None:
+                return self.open(connect or self.connect)
+            if self.healthy(connection, returned):
+                return connection
+            self.release(connection)
+
+    def open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        self.start_reaper()
+        return connection
+
+    def healthy(self, connection, returned):
+        if connection.closed:
+            return False
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - returned < self.health_check_after:
+            return True
+        return is_alive(connection)
+
+    def checkin(self, connection):
+        status = (None if connection.closed
+                  else connection.get_transaction_status())
+        if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+            except Exception:
+                status = None
+            else:
+                status = TRANSACTION_STATUS_IDLE
+        if status != TRANSACTION_STATUS_IDLE:
+            self.release(connection)
+            return
+        with self.condition:
+            if self.closed:
+                self.size -= 1
+            else:
+                self.idle.append((connection, time.monotonic()))
+                self.condition.notify()
+                return
+        discard(connection)
+
+    def release(self, connection):
+        """Закрывает соединение и освобождает его место в пуле."""
+        discard(connection)
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def reap(self):
+        expired = []
+        with self.condition:
+            now = time.monotonic()
+            while self.idle and now - self.idle[0][1] >= self.max_idle:
+                expired.append(self.idle.popleft()[0])
+            self.size -= len(expired)
+            if expired:
+                self.condition.notify(len(expired))
+        for connection in expired:
+            discard(connection)
+        return len(expired)
+
+    def start_reaper(self):
+        if self.reaper is not None or not self.max_idle:
+            return
+        with self.condition:
+            if self.reaper is None:
+                self.reaper = threading.Thread(target=self.reap_loop,
+                                               daemon=True)
+                self.reaper.start()
+
+    def reap_loop(self):
+        while True:
+            with self.condition:
+                if self.closed:
+                    return
+            time.sleep(self.max_idle / 2)
+            self.reap()
+
+    def close(self):
+        """Закрывает свободные соединения; занятые закроются при возврате."""
+        with self.condition:
+            self.closed = True
+            idle = [connection for connection, _ in self.idle]
+            self.idle.clear()
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection in idle:
+            discard(connection)
+
+
+_lock = threading.Lock()
+_pools = {}
+_pid = None
+# Пулы, унаследованные от родителя при fork. Их соединения нельзя ни
+# использовать, ни закрывать (закрытие оборвало бы сеанс родителя), и
+# они хранятся здесь, чтобы сборщик мусора их не закрыл.
+_inherited = []
+
+
+def get_pool(key, connect, **options):
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            _inherited.extend(_pools.values())
+            _pools.clear()
+            _pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
+
+
+def close_pools(database=None):
+    """Закрывает пулы процесса, например перед удалением тестовой БД."""
+    with _lock:
+        keys = [key for key in _pools
+                if database is None or dict(key).get('database') == database]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
@@ -1,6 +1,7 @@
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -34,6 +35,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilerMiddleware',
+    'api.metrics.MetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,10 +78,132 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='test'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='test'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5234')
+        'PORT': os.getenv('DB_PORT', default='5234'),
+        # Соединение живет между запросами потока до CONN_MAX_AGE секунд
+        # вместо нового подключения на каждый запрос.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+# DB_POOL=1: соединения берутся из пула процесса, общего для всех его
+# потоков (api_yamdb/postgresql_pool). Поток возвращает соединение в пул
+# в конце каждого запроса, поэтому потоков ASGI может быть больше, чем
+# соединений.
+if os.getenv('DB_POOL') == '1':
+    DATABASES['default'].update({
+        'ENGINE': 'api_yamdb.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=30)),
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', default=300)),
+            'HEALTH_CHECK_AFTER': float(
+                os.getenv('DB_POOL_HEALTH_CHECK_AFTER', default=5)
+            ),
+        },
+    })
+
+# DB_REPLICA_HOSTS=host[:port],...: реплики только для чтения с теми же
+# именем БД и учетными данными. Запросы GET читают из них, остальные
+# запросы и все, что после записи, работают с основной БД
+# (api/replicas.py).
+DATABASE_REPLICAS = []
+for index, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(','))):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+# Сколько секунд клиент после записи читает из основной БД.
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', default=5))
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api_yamdb',
+    }
+}
+
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Отметки read-your-writes и позиции журнала для реплик должны быть
+# общими для всех воркеров.
+if DATABASE_REPLICAS and not os.getenv('REDIS_URL'):
+    raise ImproperlyConfigured(
+        'DB_REPLICA_HOSTS requires REDIS_URL: the replica pins and '
+        'positions must be shared by all workers'
+    )
+
+API_CACHE_ALIAS = 'default'
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=600))
+
+# Списки произведений, отзывов и комментариев собираются из .values()
+# без ModelSerializer (api/fast.py).
+API_FAST_SERIALIZERS = os.getenv('API_FAST_SERIALIZERS', default='1') == '1'
+
+# Наибольшее число объектов в одном пакетном запросе (api/bulk.py).
+API_BULK_MAX_ITEMS = int(os.getenv('API_BULK_MAX_ITEMS', default=1000))
+
+# Метрики запросов (api/metrics.py): заголовок Server-Timing, гистограммы
+# для /metrics и, при API_METRICS_LOG=1, строка JSON на запрос в логе.
+API_METRICS = os.getenv('API_METRICS', default='1') == '1'
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+# Профилирование запросов администраторов по ?profile= или X-Profile
+# (api/profiling.py); частота ограничена корзиной 'profile'.
+API_PROFILER = os.getenv('API_PROFILER', default='1') == '1'
+
+# Интервал в секундах между снимками стека в режиме speedscope.
+PROFILER_SAMPLE_INTERVAL = float(
+    os.getenv('PROFILER_SAMPLE_INTERVAL', default=0.001)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.metrics': {
+            'handlers': ['console'],
+            'level': ('INFO' if os.getenv('API_METRICS_LOG') == '1'
+                      else 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Хранилище корзин троттлинга регистрации и выдачи токенов: память
+# процесса для одного узла, Redis для нескольких процессов и узлов.
+AUTH_THROTTLE_STORE = os.getenv(
+    'AUTH_THROTTLE_STORE',
+    default='api.throttling.RedisBucketStore' if os.getenv('REDIS_URL')
+    else 'api.throttling.LocalBucketStore'
+)
+
+
+# Full-text search
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
 
 # Password validation
 
@@ -123,20 +249,57 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'reviews.User'
 
+# Пользователь запроса собирается из claims токена (роль, is_superuser),
+# без чтения таблицы пользователей; токены со старой версией отклоняются.
+STATELESS_JWT = os.getenv('STATELESS_JWT', default='1') == '1'
+# Сколько секунд версия токенов пользователя живет в кэше. С локальным
+# кэшем другие процессы увидят отзыв токенов не позже этого времени.
+TOKEN_VERSION_CACHE_TIMEOUT = int(
+    os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', default=60)
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.StatelessJWTAuthentication'
+        if STATELESS_JWT else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 
+    # JSON кодируется и разбирается orjson, без него - модулем json.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
+    # Перед приложением один nginx, который записывает адрес клиента в
+    # X-Forwarded-For; по нему работают ограничения частоты по IP.
+    'NUM_PROXIES': 1,
+
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
 
     'PAGE_SIZE': 10,
 
+    # Корзины токенов для регистрации и получения токена (api/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '20/hour',
+        'signup_username': '5/hour',
+        'token_ip': '60/hour',
+        'token_username': '10/hour',
+        # Профилирование запросов администраторами (api/profiling.py)
+        'profile': '30/hour',
+    },
+
 }
 
 SIMPLE_JWT = {
@@ -149,3 +312,7 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NO_REPLY_EMAIL = 'no-reply@yamdb.fake'
+
+# Письма складываются в таблицу OutgoingEmail и отправляются командой
+# send_outbox; EMAIL_OUTBOX=0 возвращает отправку прямо из запроса.
+EMAIL_OUTBOX = os.getenv('EMAIL_OUTBOX', default='1') == '1'
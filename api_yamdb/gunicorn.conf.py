@@ -0,0 +1,9 @@
+import os
+
+bind = '0:8000'
+
+# SERVER_MODE=asgi: api_yamdb.asgi под uvicorn-воркерами вместо
+# синхронных воркеров для api_yamdb.wsgi. Число воркеров задается
+# переменной WEB_CONCURRENCY.
+if os.getenv('SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
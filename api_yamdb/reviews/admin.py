@@ -1,14 +1,66 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from .models import User, Category, Genre, Title, Review, Comment
 
 
-class TitleAdmin(admin.ModelAdmin):
+class EstimatedCountPaginator(Paginator):
+    """На больших таблицах PostgreSQL число строк списка без фильтров
+    берется из статистики таблицы (pg_class.reltuples) вместо COUNT(*).
+    Точный COUNT выполняется для отфильтрованных списков и если оценка
+    меньше estimate_threshold."""
+
+    estimate_threshold = 10000
+
+    def estimate_count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.has_filters() or query.distinct:
+            return None
+        if query.combinator or query.low_mark or query.high_mark is not None:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(query.model._meta.db_table)]
+            )
+            row = cursor.fetchone()
+        # -1 (или 0 до PostgreSQL 14): таблицу еще не анализировали.
+        if row is None or row[0] <= 0:
+            return None
+        return int(row[0])
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class UserAdmin(LargeTableAdmin):
+    list_display = ('username', 'email', 'role', 'is_active')
+    search_fields = ('username', 'email')
+    list_filter = ('role',)
+
+
+class TitleAdmin(LargeTableAdmin):
     list_display = ('pk', 'name', 'year', 'description', 'category')
+    list_select_related = ('category',)
     search_fields = ('name',)
     list_filter = ('year',)
     empty_value_display = '-пусто-'
     list_editable = ('description',)
+    autocomplete_fields = ('category',)
 
 
 class ClassificationAdmin(admin.ModelAdmin):
@@ -17,16 +69,21 @@ class ClassificationAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = ('id', 'title', 'text', 'author', 'score', 'pub_date')
-    search_fields = ('title',)
+    list_select_related = ('title', 'author')
+    search_fields = ('title__name',)
+    autocomplete_fields = ('title', 'author')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('id', 'review', 'text', 'author', 'pub_date')
+    list_select_related = ('review', 'author')
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('review',)
 
 
-admin.site.register(User)
+admin.site.register(User, UserAdmin)
 admin.site.register(Category, ClassificationAdmin)
 admin.site.register(Genre, ClassificationAdmin)
 admin.site.register(Title, TitleAdmin)
@@ -0,0 +1,160 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.search import rebuild_search_vectors
+from reviews.summary import rebuild_review_summary
+
+WORDS = ('star', 'night', 'river', 'king', 'war', 'love', 'city', 'ghost',
+         'winter', 'shadow', 'garden', 'ocean', 'iron', 'dream', 'silver')
+
+CATEGORIES = 10
+GENRES = 20
+
+
+class Command(BaseCommand):
+    help = ('Add synthetic users, titles, reviews and comments with bulk '
+            'inserts. Args: [--users <count>] [--titles <count>] '
+            '[--reviews-per-title <count>] [--comments-per-review <count>]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=10000)
+        parser.add_argument('--reviews-per-title', type=int, default=10)
+        parser.add_argument('--comments-per-review', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def insert(self, model, objs):
+        with transaction.atomic():
+            model.objects.bulk_create(objs)
+        self.inserted[model] = self.inserted.get(model, 0) + len(objs)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'{model.__name__}: {self.inserted[model]} rows, '
+            f'{sum(self.inserted.values()) / elapsed:.0f} rows/sec'
+        )
+
+    def stream(self, model, objs):
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self.insert(model, batch)
+                batch = []
+        if batch:
+            self.insert(model, batch)
+
+    def ensure_classification(self):
+        categories = [
+            Category.objects.get_or_create(
+                slug=f'category-{index}', defaults={'name': f'C {index}'}
+            )[0].pk for index in range(CATEGORIES)
+        ]
+        genres = [
+            Genre.objects.get_or_create(
+                slug=f'genre-{index}', defaults={'name': f'G {index}'}
+            )[0].pk for index in range(GENRES)
+        ]
+        return categories, genres
+
+    def generate_users(self, count):
+        first = self.next_id(User)
+        self.stream(User, (
+            User(id=pk, username=f'load_user_{pk}',
+                 email=f'load_user_{pk}@yamdb.fake')
+            for pk in range(first, first + count)
+        ))
+
+    def generate_titles(self, count):
+        categories, genres = self.ensure_classification()
+        first = self.next_id(Title)
+        title_ids = range(first, first + count)
+        self.stream(Title, (
+            Title(id=pk, name=' '.join(random.sample(WORDS, 3)),
+                  year=random.randint(1900, 2020),
+                  category_id=random.choice(categories))
+            for pk in title_ids
+        ))
+        self.stream(GenreTitle, (
+            GenreTitle(title_id=pk, genre_id=genre_id)
+            for pk in title_ids
+            for genre_id in random.sample(genres, 2)
+        ))
+        return title_ids
+
+    def generate_reviews(self, title_ids, per_title):
+        authors = list(User.objects.values_list('pk', flat=True))
+        if per_title > len(authors):
+            raise CommandError(
+                'Not enough users for unique reviews: increase --users')
+        now = timezone.now()
+        first = self.next_id(Review)
+        review_ids = range(first, first + len(title_ids) * per_title)
+        pks = iter(review_ids)
+        self.stream(Review, (
+            Review(id=next(pks), title_id=title_id, author_id=author_id,
+                   text=' '.join(random.choices(WORDS, k=12)),
+                   score=random.randint(1, 10),
+                   pub_date=now - timedelta(
+                       minutes=random.randint(0, 10 ** 6)))
+            for title_id in title_ids
+            for author_id in random.sample(authors, per_title)
+        ))
+        return review_ids, authors
+
+    def generate_comments(self, review_ids, authors, per_review):
+        now = timezone.now()
+        self.stream(Comment, (
+            Comment(review_id=review_id, author_id=random.choice(authors),
+                    text=' '.join(random.choices(WORDS, k=6)),
+                    pub_date=now - timedelta(
+                        minutes=random.randint(0, 10 ** 6)))
+            for review_id in review_ids
+            for _ in range(per_review)
+        ))
+
+    def reset_sequences(self):
+        models = [User, Title, GenreTitle, Review, Comment]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.inserted = {}
+        self.started = time.monotonic()
+
+        self.generate_users(options['users'])
+        title_ids = self.generate_titles(options['titles'])
+        self.reset_sequences()
+        if options['reviews_per_title']:
+            review_ids, authors = self.generate_reviews(
+                title_ids, options['reviews_per_title']
+            )
+            self.reset_sequences()
+            if options['comments_per_review']:
+                self.generate_comments(review_ids, authors,
+                                       options['comments_per_review'])
+                self.reset_sequences()
+            Title.objects.filter(
+                pk__gte=title_ids.start, pk__lt=title_ids.stop
+            ).rebuild_ratings()
+        rebuild_search_vectors()
+        rebuild_review_summary()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(self.inserted.values())} rows are generated in '
+            f'{time.monotonic() - self.started:.1f} sec'))
@@ -1,59 +1,383 @@
 import csv
+import io
 import os
-from datetime import datetime
-import pytz
+import time
+from itertools import islice
 
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
 from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
                             Title, User)
+from reviews.search import rebuild_search_vectors
+from reviews.summary import rebuild_review_summary
+
+SOURCES = (
+    ('category.csv', Category),
+    ('genre.csv', Genre),
+    ('users.csv', User),
+    ('titles.csv', Title),
+    ('review.csv', Review),
+    ('comments.csv', Comment),
+    ('genre_title.csv', GenreTitle),
+)
+
+INTEGER_TYPES = {
+    'AutoField': 'IntegerField',
+    'BigAutoField': 'BigIntegerField',
+    'IntegerField': 'IntegerField',
+    'BigIntegerField': 'BigIntegerField',
+    'SmallIntegerField': 'SmallIntegerField',
+    'PositiveIntegerField': 'PositiveIntegerField',
+    'PositiveSmallIntegerField': 'PositiveSmallIntegerField',
+}
+INTEGER_PATTERN = r'^\s*[+-]?\d{1,19}\s*$'
+DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+DATETIME_PATTERN = (
+    r'^\d{4}-\d{2}-\d{2}'
+    r'([T ]([01]\d|2[0-3]):[0-5]\d(:[0-5]\d(\.\d{1,6})?)?'
+    r'\s*(Z|[+-]([01]\d|2[0-3])(:?[0-5]\d)?)?)?$'
+)
+
+
+class RowStream:
+    """Файл для COPY из строк CSV: строки с другим числом колонок, на
+    которых COPY прервался бы, пропускаются и считаются в skipped."""
+
+    chunk_rows = 1000
+
+    def __init__(self, reader, width, command):
+        self.reader = reader
+        self.width = width
+        self.command = command
+        self.buffer = ''
+
+    def fill(self):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        rows = list(islice(self.reader, self.chunk_rows))
+        for row in rows:
+            if len(row) == self.width:
+                writer.writerow(row)
+            else:
+                self.command.skipped += 1
+        self.buffer += out.getvalue()
+        return bool(rows)
+
+    def read(self, size=-1):
+        while (size < 0 or len(self.buffer) < size) and self.fill():
+            pass
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
 
 
 class Command(BaseCommand):
-    help = 'Add data from CSV-file to database. Args: <file.csv> <model>'
+    help = ('Add data from CSV-files to database. '
+            'Args: [--source-dir <dir>] [--batch-size <rows>] '
+            '[--engine batch|copy]')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source-dir', default='static/data/',
+            help='Directory with category.csv, genre.csv, users.csv, ...'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows inserted per bulk_create call and transaction'
+        )
+        parser.add_argument(
+            '--engine', choices=('batch', 'copy'), default='batch',
+            help='copy streams files through PostgreSQL COPY into staging '
+                 'tables; other databases fall back to batch'
+        )
+
+    def known_ids(self, model):
+        if model not in self.id_maps:
+            self.id_maps[model] = set(
+                model.objects.values_list('pk', flat=True)
+            )
+        return self.id_maps[model]
+
+    def resolve_columns(self, model, header):
+        columns = []
+        for key in header:
+            field = model._meta.get_field(key)
+            columns.append((field.attname, field))
+        return columns
+
+    def build_object(self, model, columns, row):
+        values = {}
+        for (attname, field), value in zip(columns, row):
+            if field.is_relation:
+                value = int(value) if value else None
+                if (value is not None
+                        and value not in self.known_ids(field.related_model)):
+                    return None
+            elif field.primary_key:
+                value = int(value)
+            else:
+                value = field.to_python(value)
+                field.run_validators(value)
+            values[attname] = value
+        return model(**values)
+
+    def read_objects(self, path, model):
+        with open(path, encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            columns = self.resolve_columns(model, header)
+            for row in reader:
+                try:
+                    obj = (self.build_object(model, columns, row)
+                           if len(row) == len(columns) else None)
+                except (ValueError, ValidationError):
+                    obj = None
+                if obj is None:
+                    self.skipped += 1
+                    continue
+                yield obj
+
+    def stored_ids(self, model, ids):
+        stored = set()
+        if not ids:
+            return stored
+        size = connection.ops.bulk_batch_size(['pk'], ids) or len(ids)
+        for start in range(0, len(ids), size):
+            stored.update(model.objects.filter(
+                pk__in=ids[start:start + size]
+            ).values_list('pk', flat=True))
+        return stored
 
-    def import_to_db(self, file, model, *args):
-        path_dir = 'static/data/'
-        path = path_dir + file
-        if os.path.exists(path):
-            with open(path, encoding='utf-8') as f:
+    def insert(self, model, objs):
+        """Вставляет объекты и возвращает число вставленных. Строки с уже
+        загруженными id и строки, которые ignore_conflicts молча отбросил
+        из-за других ограничений уникальности, считаются в conflicts."""
+        known = self.known_ids(model)
+        fresh, seen = [], set()
+        for obj in objs:
+            if obj.pk is None or (obj.pk not in known
+                                  and obj.pk not in seen):
+                seen.add(obj.pk)
+                fresh.append(obj)
+        with transaction.atomic():
+            before = model.objects.count() if None in seen else None
+            model.objects.bulk_create(
+                fresh, batch_size=self.batch_size, ignore_conflicts=True
+            )
+            if before is not None:
+                inserted = model.objects.count() - before
+            else:
+                stored = self.stored_ids(model, [obj.pk for obj in fresh])
+                # Только реально вставленные id: на отброшенные строки
+                # нельзя ссылаться из следующих файлов.
+                known.update(stored)
+                inserted = len(stored)
+        self.conflicts += len(objs) - inserted
+        return inserted
+
+    def report(self, file, rows, started, done=False):
+        elapsed = time.monotonic() - started
+        rate = rows / elapsed if elapsed else rows
+        status = 'done' if done else 'in progress'
+        self.stdout.write(
+            f'{file}: {rows} rows, {rate:.0f} rows/sec, {status}')
+
+    def import_to_db(self, file, model):
+        path = os.path.join(self.source_dir, file)
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING(f'{path} is not found'))
+            return
+        started = time.monotonic()
+        rows = 0
+        if model is GenreTitle:
+            rows = self.insert(model, list(self.read_objects(path, model)))
+        else:
+            batch = []
+            for obj in self.read_objects(path, model):
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    rows += self.insert(model, batch)
+                    batch = []
+                    self.report(file, rows, started)
+            if batch:
+                rows += self.insert(model, batch)
+        self.report(file, rows, started, done=True)
+
+    def integer_check(self, field, target, source):
+        internal = INTEGER_TYPES[target.get_internal_type()]
+        low, high = connection.ops.integer_field_range(internal)
+        for validator in field.validators:
+            limit = validator.limit_value
+            limit = limit() if callable(limit) else limit
+            if isinstance(validator, MinValueValidator):
+                low = limit if low is None else max(low, limit)
+            elif isinstance(validator, MaxValueValidator):
+                high = limit if high is None else min(high, limit)
+        bounds = [f'{source}::numeric >= {int(low)}' if low is not None
+                  else 'TRUE',
+                  f'{source}::numeric <= {int(high)}' if high is not None
+                  else 'TRUE']
+        return (f"CASE WHEN {source} ~ '{INTEGER_PATTERN}' "
+                f"THEN {' AND '.join(bounds)} ELSE FALSE END")
+
+    def date_check(self, pattern, source):
+        value = f'btrim({source})'
+        year, month, day = (f'substr({value}, {start}, {length})::int'
+                            for start, length in ((1, 4), (6, 2), (9, 2)))
+        last_day = (f"extract(day FROM make_date({year}, {month}, 1) "
+                    f"+ interval '1 month - 1 day')")
+        # CASE вычисляет ветви по порядку, поэтому make_date получает
+        # только существующий месяц.
+        return (f"CASE WHEN {value} !~ '{pattern}' THEN FALSE "
+                f"WHEN {year} < 1 OR {month} NOT BETWEEN 1 AND 12 "
+                f"THEN FALSE ELSE {day} BETWEEN 1 AND {last_day} END")
+
+    def value_check(self, field, source):
+        """Условие SQL, при котором значение колонки приводится к типу
+        поля без ошибки и проходит его ограничения, как run_validators
+        в пакетном режиме. None — значение не проверяется."""
+        target = field.target_field if field.is_relation else field
+        internal = target.get_internal_type()
+        if internal in INTEGER_TYPES:
+            return self.integer_check(field, target, source)
+        if internal == 'DateField':
+            return self.date_check(DATE_PATTERN, source)
+        if internal == 'DateTimeField':
+            return self.date_check(DATETIME_PATTERN, source)
+        if getattr(field, 'max_length', None):
+            return f'char_length({source}) <= {int(field.max_length)}'
+        return None
+
+    def merge_columns(self, model, header):
+        """Колонки и выражения для переноса строк из staging-таблицы и
+        условия, отбрасывающие некорректные строки."""
+        quote = connection.ops.quote_name
+        columns = self.resolve_columns(model, header)
+        targets, expressions, params, conditions = [], [], [], []
+        for (attname, field), key in zip(columns, header):
+            source = f's.{quote(key)}'
+            if field.is_relation:
+                source = f"NULLIF({source}, '')"
+            elif not field.null and field.empty_strings_allowed:
+                source = f"COALESCE({source}, '')"
+            cast = f'{source}::{field.cast_db_type(connection)}'
+            check = self.value_check(field, source)
+            if field.is_relation:
+                related = field.related_model._meta
+                check = (
+                    f'CASE WHEN {check} THEN EXISTS (SELECT 1 FROM '
+                    f'{quote(related.db_table)} r WHERE '
+                    f'r.{quote(related.pk.column)} = {cast}) ELSE FALSE END'
+                )
+            if check and field.null:
+                check = f'({source} IS NULL OR {check})'
+            elif not check and not field.null:
+                check = f'{source} IS NOT NULL'
+            if check:
+                conditions.append(check)
+            targets.append(quote(field.column))
+            expressions.append(cast)
+
+        loaded = {field.attname for attname, field in columns}
+        for field in model._meta.concrete_fields:
+            if field.attname in loaded or field.primary_key:
+                continue
+            targets.append(quote(field.column))
+            expressions.append('%s')
+            params.append(field.get_db_prep_save(field.get_default(),
+                                                 connection))
+        return targets, expressions, params, conditions
+
+    def copy_to_db(self, file, model):
+        path = os.path.join(self.source_dir, file)
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING(f'{path} is not found'))
+            return
+        with open(path, encoding='utf-8') as f:
+            header = next(csv.reader(f), None)
+        if header is None:
+            return
+
+        quote = connection.ops.quote_name
+        table = model._meta.db_table
+        staging = quote(f'import_{table}')
+        targets, expressions, params, conditions = self.merge_columns(
+            model, header
+        )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        started = time.monotonic()
+        with transaction.atomic(), connection.cursor() as cursor:
+            columns = ', '.join(f'{quote(key)} text' for key in header)
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ({columns}) '
+                f'ON COMMIT DROP'
+            )
+            with open(path, encoding='utf-8', newline='') as f:
                 reader = csv.reader(f)
-                header = next(reader, None)
-                object_dict = {}
-                for row in reader:
-                    dict = {
-                        key: value for key, value in zip(header, row)
-                    }
-                    for key, value in dict.items():
-                        if key == 'category':
-                            value = Category.objects.get(id=value)
-                        if key == 'title_id':
-                            key = 'title'
-                            value = Title.objects.get(id=value)
-                        if key == 'author':
-                            value = User.objects.get(id=value)
-                        if key == 'review':
-                            value = Review.objects.get(id=value)
-                        if key == 'genre_id':
-                            key = 'genre'
-                            value = Genre.objects.get(id=value)
-                        if key == 'pub_date':
-                            value = datetime.strptime(
-                                value, "%Y-%m-%dT%H:%M:%S.%fZ"
-                            )
-                            value = pytz.utc.localize(value)
-                        object_dict[key] = value
-                    model.objects.get_or_create(**object_dict)
-
-    def handle(self, *args, **kwargs):
-
-        self.import_to_db(file='category.csv', model=Category)
-        self.import_to_db(file='genre.csv', model=Genre)
-        self.import_to_db(file='users.csv', model=User)
-        self.import_to_db(file='titles.csv', model=Title)
-        self.import_to_db(file='review.csv', model=Review)
-        self.import_to_db(file='comments.csv', model=Comment)
-        self.import_to_db(file='genre_title.csv', model=GenreTitle)
+                next(reader)
+                cursor.copy_expert(
+                    f'COPY {staging} FROM STDIN WITH (FORMAT csv)',
+                    RowStream(reader, len(header), self)
+                )
+            cursor.execute(f'SELECT count(*) FROM {staging}')
+            staged = cursor.fetchone()[0]
+            cursor.execute(f'SELECT count(*) FROM {staging} s {where}')
+            matched = cursor.fetchone()[0]
+            cursor.execute(
+                f"INSERT INTO {quote(table)} ({', '.join(targets)}) "
+                f"SELECT {', '.join(expressions)} FROM {staging} s {where} "
+                f"ON CONFLICT DO NOTHING",
+                params
+            )
+            inserted = cursor.rowcount
+        self.skipped += staged - matched
+        self.conflicts += matched - inserted
+        self.report(file, inserted, started, done=True)
+
+    def reset_sequences(self):
+        models = [model for file, model in SOURCES]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def handle(self, *args, **options):
+        self.source_dir = options['source_dir']
+        self.batch_size = options['batch_size']
+        self.id_maps = {}
+        self.skipped = 0
+        self.conflicts = 0
+
+        load = self.import_to_db
+        if options['engine'] == 'copy':
+            if connection.vendor == 'postgresql':
+                load = self.copy_to_db
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'COPY is not supported by {connection.vendor}, '
+                    f'falling back to batch engine'))
+        for file, model in SOURCES:
+            load(file=file, model=model)
+
+        self.reset_sequences()
+        Title.objects.rebuild_ratings()
+        rebuild_search_vectors()
+        rebuild_review_summary()
 
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'{self.skipped} malformed rows or rows with unknown foreign '
+                f'keys are skipped'))
+        if self.conflicts:
+            self.stdout.write(self.style.WARNING(
+                f'{self.conflicts} rows conflicting with existing ids or '
+                f'unique values are skipped'))
         self.stdout.write(self.style.SUCCESS(
             'CSV-files are successfully imported'))
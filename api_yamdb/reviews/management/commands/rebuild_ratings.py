@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Title
+from reviews.summary import (actual_counts, rebuild_review_summary,
+                             stored_counts)
+
+
+class Command(BaseCommand):
+    help = ('Rebuild denormalized rating and reviews_count of titles and '
+            'the review summary from the reviews table. Args: [--check]')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only verify stored values, do not change anything'
+        )
+
+    def find_mismatches(self):
+        titles = Title.objects.with_review_totals().order_by('pk')
+        for title in titles.iterator():
+            if (title.reviews_count != title.actual_count
+                    or title.scores_sum != title.actual_sum):
+                yield title
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = list(self.find_mismatches())
+            for title in mismatches:
+                self.stdout.write(
+                    f'Title {title.pk}: stored {title.reviews_count} '
+                    f'reviews / {title.scores_sum} points, actual '
+                    f'{title.actual_count} reviews / {title.actual_sum} '
+                    f'points'
+                )
+            if mismatches:
+                raise CommandError(
+                    f'{len(mismatches)} titles have stale ratings')
+            actual, stored = actual_counts(), stored_counts()
+            stale = [row for row in set(actual) | set(stored)
+                     if actual[row] != stored[row]]
+            for scope, key, score in sorted(stale):
+                self.stdout.write(
+                    f'Summary {scope} {key or "-"} score {score}: stored '
+                    f'{stored[scope, key, score]}, actual '
+                    f'{actual[scope, key, score]}'
+                )
+            if stale:
+                raise CommandError(
+                    f'{len(stale)} review summary rows are stale')
+            self.stdout.write(self.style.SUCCESS('Ratings are consistent'))
+            return
+
+        with transaction.atomic():
+            updated = Title.objects.rebuild_ratings()
+            rows = rebuild_review_summary()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ratings of {updated} titles and {rows} review summary rows '
+            f'are rebuilt'))
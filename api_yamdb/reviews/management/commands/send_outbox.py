@@ -0,0 +1,189 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reviews.models import FAILED, PENDING, SENT, OutgoingEmail
+
+UPDATED_FIELDS = ('status', 'attempts', 'next_attempt', 'last_error', 'sent')
+
+
+class MailServerUnavailable(Exception):
+    """Не удалось открыть соединение с почтовым сервером."""
+
+
+class Command(BaseCommand):
+    help = ('Send queued emails in batches over one reused mail connection '
+            'per worker. Args: [--batch-size <count>] [--workers <count>] '
+            '[--loop]')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Threads, each with its own connection')
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backoff', type=float, default=30,
+                            help='First retry delay in seconds, doubled '
+                                 'after every failed attempt')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue instead of exiting '
+                                 'once it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Polling interval of --loop in seconds')
+        parser.add_argument('--lease', type=float, default=300,
+                            help='Seconds a claimed batch is hidden from '
+                                 'other workers; emails of a crashed '
+                                 'worker are retried after it')
+        parser.add_argument('--max-backoff', type=float, default=600,
+                            help='Longest pause of --loop while the mail '
+                                 'server is unavailable')
+
+    def claim(self):
+        """Берет пачку готовых писем и переносит их next_attempt на время
+        аренды, чтобы их не взяли другие воркеры. Транзакция с блокировками
+        строк заканчивается до отправки писем."""
+        with transaction.atomic():
+            queue = OutgoingEmail.objects.filter(
+                status=PENDING, next_attempt__lte=timezone.now()
+            )
+            if connection.features.has_select_for_update_skip_locked:
+                queue = queue.select_for_update(skip_locked=True)
+            batch = list(queue[:self.batch_size])
+            if batch:
+                OutgoingEmail.objects.filter(
+                    pk__in=[email.pk for email in batch]
+                ).update(next_attempt=timezone.now() + timedelta(
+                    seconds=self.lease))
+        return batch
+
+    def release(self, emails):
+        """Возвращает неотправленные письма в очередь, не тратя попыток."""
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt=timezone.now() + timedelta(
+            seconds=self.backoff))
+
+    def open(self, mail_connection):
+        try:
+            mail_connection.open()
+        except Exception as error:
+            raise MailServerUnavailable(
+                f'{type(error).__name__}: {error}') from error
+
+    def deliver(self, mail_connection, email):
+        message = EmailMessage(
+            email.subject, email.body, email.from_email, [email.recipient],
+            connection=mail_connection
+        )
+        email.attempts += 1
+        try:
+            message.send()
+        except Exception as error:
+            email.last_error = f'{type(error).__name__}: {error}'
+            if email.attempts >= self.max_attempts:
+                email.status = FAILED
+            else:
+                delay = self.backoff * 2 ** (email.attempts - 1)
+                email.next_attempt = timezone.now() + timedelta(
+                    seconds=delay)
+            return False
+        email.status = SENT
+        email.sent = timezone.now()
+        email.last_error = ''
+        return True
+
+    def send_batch(self, mail_connection, batch):
+        """Отправляет пачку, переоткрывая соединение после каждой ошибки.
+        Если сервер недоступен, остаток пачки возвращается в очередь."""
+        sent = failed = 0
+        done = []
+        connected = False
+        try:
+            for email in batch:
+                if not connected:
+                    mail_connection.close()
+                    self.open(mail_connection)
+                    connected = True
+                done.append(email)
+                if self.deliver(mail_connection, email):
+                    sent += 1
+                else:
+                    failed += 1
+                    connected = False
+        except MailServerUnavailable:
+            self.release(batch[len(done):])
+            raise
+        finally:
+            OutgoingEmail.objects.bulk_update(done, UPDATED_FIELDS)
+        return sent, failed
+
+    def drain(self):
+        """Отправляет очередь пачками, пока в ней есть готовые письма.
+        Возвращает (sent, failed, error), где error - ошибка соединения с
+        почтовым сервером, на которой отправка остановилась."""
+        sent = failed = 0
+        mail_connection = get_connection()
+        try:
+            while True:
+                batch = self.claim()
+                if not batch:
+                    break
+                batch_sent, batch_failed = self.send_batch(mail_connection,
+                                                           batch)
+                sent += batch_sent
+                failed += batch_failed
+        except MailServerUnavailable as error:
+            return sent, failed, error
+        finally:
+            mail_connection.close()
+        return sent, failed, None
+
+    def drain_in_thread(self):
+        try:
+            return self.drain()
+        finally:
+            connection.close()
+
+    def run_workers(self, workers):
+        if not connection.features.has_select_for_update_skip_locked:
+            workers = 1
+        if workers == 1:
+            return [self.drain()]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.drain_in_thread) for _ in range(workers)
+            ]
+            return [future.result() for future in futures]
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.max_attempts = options['max_attempts']
+        self.backoff = options['backoff']
+        self.lease = options['lease']
+
+        outages = 0
+        while True:
+            results = self.run_workers(options['workers'])
+            sent = sum(result[0] for result in results)
+            failed = sum(result[1] for result in results)
+            errors = [result[2] for result in results if result[2]]
+            if sent or failed:
+                self.stdout.write(
+                    f'{sent} emails are sent, {failed} attempts failed')
+            delay = options['interval']
+            if errors:
+                delay = min(self.backoff * 2 ** outages,
+                            options['max_backoff'])
+                outages += 1
+                self.stderr.write(
+                    f'Mail server is unavailable ({errors[0]}), retrying '
+                    f'in {delay:.0f} s')
+            else:
+                outages = 0
+            if not options['loop']:
+                break
+            time.sleep(delay)
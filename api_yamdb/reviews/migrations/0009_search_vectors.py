@@ -0,0 +1,63 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:25
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_FIELDS = (
+    ('Title', 'reviews_title', (('name', 'A'), ('description', 'B'))),
+    ('Review', 'reviews_review', (('text', 'A'),)),
+    ('Comment', 'reviews_comment', (('text', 'A'),)),
+)
+
+
+def create_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, table, fields in SEARCH_FIELDS:
+        vector = None
+        for field, weight in fields:
+            part = SearchVector(field, weight=weight,
+                                config=settings.SEARCH_CONFIG)
+            vector = part if vector is None else vector + part
+        apps.get_model('reviews', model_name).objects.update(
+            search_vector=vector
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} '
+            f'USING gin (search_vector)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, table, fields in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_vectors, drop_search_indexes),
+    ]
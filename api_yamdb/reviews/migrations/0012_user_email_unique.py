@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:33
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import reviews.models
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """Уникальный индекс не создастся, пока email повторяются; какой из
+    пользователей лишний, решает администратор."""
+    User = apps.get_model('reviews', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(email='').values('email')
+        .annotate(users=Count('id')).filter(users__gt=1)
+        .values_list('email', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Emails are used by several users, change them before '
+            'migrating: ' + ', '.join(sorted(duplicates))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', reviews.models.SignupUserManager()),
+            ],
+        ),
+        migrations.RunPython(check_duplicate_emails,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(condition=Q(_negated=True, email=''), fields=('email',), name='unique_user_email'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_summary(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewSummary = apps.get_model('reviews', 'ReviewSummary')
+    reviews = Review.objects.order_by()
+    summary = [
+        ReviewSummary(scope='overall', key='', score=score, count=total)
+        for score, total in reviews.values_list('score').annotate(
+            total=Count('pk'))
+    ]
+    for scope, field in (('title', 'title_id'),
+                         ('category', 'title__category_id'),
+                         ('genre', 'title__genre'),
+                         ('year', 'title__year')):
+        rows = reviews.filter(**{f'{field}__isnull': False}).values_list(
+            field, 'score').annotate(total=Count('pk'))
+        summary.extend(
+            ReviewSummary(scope=scope, key=str(key), score=score,
+                          count=total)
+            for key, score, total in rows
+        )
+    ReviewSummary.objects.bulk_create(summary, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_user_email_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('title', 'Произведение'), ('category', 'Категория'), ('genre', 'Жанр'), ('year', 'Год выпуска'), ('overall', 'Все произведения')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=20)),
+                ('score', models.SmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reviewsummary',
+            constraint=models.UniqueConstraint(fields=('scope', 'key', 'score'), name='unique_review_summary'),
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
 from datetime import date
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import (IntegrityError, connections, models, router,
+                       transaction)
+from django.db.models import (DEFERRED, Avg, Count, ExpressionWrapper, F,
+                              FloatField, OuterRef, Q, Subquery, Sum, sql)
+from django.db.models.functions import Cast, Coalesce, Now, NullIf
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -16,6 +21,120 @@ USER_ROLES = (
     (ADMIN, 'Администратор'),
 )
 
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+EMAIL_STATUSES = (
+    (PENDING, 'В очереди'),
+    (SENT, 'Отправлено'),
+    (FAILED, 'Не доставлено'),
+)
+
+MIN_SCORE = 0
+MAX_SCORE = 10
+
+BY_TITLE = 'title'
+BY_CATEGORY = 'category'
+BY_GENRE = 'genre'
+BY_YEAR = 'year'
+OVERALL = 'overall'
+
+SUMMARY_SCOPES = (
+    (BY_TITLE, 'Произведение'),
+    (BY_CATEGORY, 'Категория'),
+    (BY_GENRE, 'Жанр'),
+    (BY_YEAR, 'Год выпуска'),
+    (OVERALL, 'Все произведения'),
+)
+
+
+class SignupConflict(Exception):
+    """Имя пользователя или email уже заняты другим пользователем."""
+
+    def __init__(self, field):
+        super().__init__(field)
+        self.field = field
+
+
+class SignupRetriesExhausted(Exception):
+    """Конкурирующие транзакции SIGNUP_ATTEMPTS раз подряд меняли строки,
+    с которыми конфликтует регистрация."""
+
+
+SIGNUP_ATTEMPTS = 3
+
+
+def classify_signup(users, username, email):
+    """По вставленной строке или строкам, с которыми конфликтует вставка,
+    возвращает (user, created) или выбрасывает SignupConflict."""
+    for user, created in users:
+        if created or (user.username == username and user.email == email):
+            return user, created
+    if any(user.email == email for user, created in users):
+        raise SignupConflict('email')
+    raise SignupConflict('username')
+
+
+class SignupUserManager(UserManager):
+
+    def signup(self, username, email):
+        """Создает пользователя или находит зарегистрированного ранее с
+        теми же username и email. Возвращает (user, created); если username
+        или email заняты другим пользователем, выбрасывает SignupConflict."""
+        using = self._db or router.db_for_write(self.model)
+        if connections[using].vendor == 'postgresql':
+            insert = self.upsert
+        else:
+            insert = self.create_or_match
+        # Пустой результат означает, что конкурирующая транзакция вставила
+        # конфликтующую строку после снимка запроса или удалила ее.
+        for _attempt in range(SIGNUP_ATTEMPTS):
+            users = insert(username, email, using)
+            if users:
+                return classify_signup(users, username, email)
+        raise SignupRetriesExhausted(username, email)
+
+    def upsert(self, username, email, using):
+        """Один запрос: INSERT ... ON CONFLICT DO NOTHING и выборка строк,
+        с которыми он конфликтует."""
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        fields = opts.concrete_fields
+        query = sql.InsertQuery(self.model)
+        query.insert_values(
+            [field for field in fields if field is not opts.pk],
+            [self.model(username=username, email=email)]
+        )
+        (insert_sql, params), = query.get_compiler(using=using).as_sql()
+        columns = ', '.join(qn(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH inserted AS ('
+                f'{insert_sql} ON CONFLICT DO NOTHING RETURNING {columns}) '
+                f'SELECT {columns}, TRUE FROM inserted '
+                f'UNION ALL '
+                f'SELECT {columns}, FALSE FROM {qn(opts.db_table)} '
+                f'WHERE {qn("username")} = %s OR {qn("email")} = %s',
+                (*params, username, email)
+            )
+            rows = cursor.fetchall()
+        names = [field.attname for field in fields]
+        return [(self.model.from_db(using, names, row[:-1]), row[-1])
+                for row in rows]
+
+    def create_or_match(self, username, email, using):
+        manager = self.db_manager(using)
+        try:
+            with transaction.atomic(using=using):
+                return [(manager.create(username=username, email=email),
+                         True)]
+        except IntegrityError:
+            return [(user, False) for user in manager.filter(
+                Q(username=username) | Q(email=email)
+            )]
+
 
 class User(AbstractUser):
     role = models.CharField(
@@ -28,6 +147,18 @@ class User(AbstractUser):
                               max_length=254)
     first_name = models.CharField(_('first name'), max_length=150, blank=True)
     confirmation_code = models.CharField(max_length=200, blank=True, null=True)
+    token_version = models.PositiveIntegerField(default=0)
+
+    objects = SignupUserManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Пустой email есть у пользователей, созданных без него.
+            models.UniqueConstraint(
+                fields=['email'], condition=~Q(email=''),
+                name='unique_user_email'
+            )
+        ]
 
     @property
     def is_moderator(self):
@@ -37,6 +168,23 @@ class User(AbstractUser):
     def is_admin(self):
         return self.role == ADMIN
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_token_claims()
+        return instance
+
+    def get_token_claims(self):
+        """Поля, которые выдаются в токене и меняют права пользователя."""
+        return {
+            'role': self.__dict__.get('role'),
+            'is_superuser': self.__dict__.get('is_superuser'),
+            'is_active': self.__dict__.get('is_active'),
+        }
+
+    def remember_token_claims(self):
+        self._token_claims = self.get_token_claims()
+
 
 class Category(models.Model):
     name = models.CharField(max_length=256, unique=True)
@@ -54,6 +202,54 @@ class Genre(models.Model):
         return self.name
 
 
+class VersionedQuerySet(models.QuerySet):
+
+    def touch(self, **fields):
+        """Увеличивает версию объектов, по которой строятся ETag."""
+        return self.update(version=F('version') + 1, modified=Now(),
+                           **fields)
+
+
+class TitleQuerySet(VersionedQuerySet):
+
+    def apply_review_delta(self, score_delta, count_delta):
+        """Атомарно сдвигает сумму оценок и число отзывов без пересчета."""
+        scores_sum = F('scores_sum') + score_delta
+        reviews_count = F('reviews_count') + count_delta
+        return self.touch(
+            scores_sum=scores_sum,
+            reviews_count=reviews_count,
+            rating=ExpressionWrapper(
+                Cast(scores_sum, FloatField()) / NullIf(reviews_count, 0),
+                output_field=FloatField()
+            ),
+        )
+
+    def with_review_totals(self):
+        return self.annotate(
+            actual_count=Count('reviews'),
+            actual_sum=Coalesce(Sum('reviews__score'), 0),
+            actual_rating=Avg('reviews__score'),
+        )
+
+    def rebuild_ratings(self):
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.touch(
+            reviews_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('pk')).values('total')
+            ), 0),
+            scores_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')
+            ), 0),
+            rating=Subquery(
+                reviews.annotate(total=Avg('score')).values('total'),
+                output_field=FloatField()
+            ),
+        )
+
+
 class Title(models.Model):
     name = models.CharField(max_length=150)
     year = models.IntegerField(
@@ -67,10 +263,37 @@ class Title(models.Model):
     genre = models.ManyToManyField(Genre, through='GenreTitle')
     description = models.CharField(max_length=2000, blank=True, null=True,
                                    default='')
+    rating = models.FloatField(blank=True, null=True)
+    reviews_count = models.PositiveIntegerField(default=0)
+    scores_sum = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1)
+    modified = models.DateTimeField(default=timezone.now)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rating'], name='title_rating_idx'),
+            models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+            models.Index(fields=['year', 'category'],
+                         name='title_year_category_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_summary_state()
+        return instance
+
+    def remember_summary_state(self):
+        self._summary_category_id = self.__dict__.get('category_id',
+                                                      DEFERRED)
+        self._summary_year = self.__dict__.get('year', DEFERRED)
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -85,8 +308,14 @@ class Review(models.Model):
         related_name='reviews'
     )
     score = models.IntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(10)])
+        validators=[MinValueValidator(MIN_SCORE),
+                    MaxValueValidator(MAX_SCORE)])
     pub_date = models.DateTimeField(default=timezone.now)
+    version = models.PositiveIntegerField(default=1)
+    modified = models.DateTimeField(default=timezone.now)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = VersionedQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -95,8 +324,22 @@ class Review(models.Model):
                 name='one_review_by_an_author_for_a_title'
             )
         ]
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
         ordering = ['pub_date']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        self._rated_title_id = self.__dict__.get('title_id')
+        self._rated_score = self.__dict__.get('score')
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -111,8 +354,13 @@ class Comment(models.Model):
         related_name='comments'
     )
     pub_date = models.DateTimeField(default=timezone.now)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
         ordering = ['-pub_date']
 
 
@@ -127,3 +375,54 @@ class GenreTitle(models.Model):
                 name='unique_genre_for_a_title'
             )
         ]
+        indexes = [
+            models.Index(fields=['genre', 'title'],
+                         name='genretitle_genre_title_idx'),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField(max_length=254)
+    recipient = models.EmailField(max_length=254)
+    status = models.CharField(max_length=10, choices=EMAIL_STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt'],
+                         name='outgoing_email_queue_idx'),
+        ]
+        ordering = ['next_attempt']
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+class ReviewSummary(models.Model):
+    """Число отзывов с каждой оценкой в разрезе произведения, категории,
+    жанра, года выпуска и по всему каталогу. Обновляется сигналами
+    отзывов (см. reviews/summary.py), поэтому статистика читается
+    несколькими строками независимо от числа отзывов."""
+
+    scope = models.CharField(max_length=10, choices=SUMMARY_SCOPES)
+    key = models.CharField(max_length=20, blank=True)
+    score = models.SmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'key', 'score'],
+                name='unique_review_summary'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.key}: {self.score} x {self.count}'
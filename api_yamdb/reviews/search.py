@@ -0,0 +1,179 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F
+
+from .models import Comment, Review, Title
+
+TITLE = 'title'
+REVIEW = 'review'
+COMMENT = 'comment'
+
+SEARCH_FIELDS = {
+    TITLE: (Title, (('name', 'A'), ('description', 'B'))),
+    REVIEW: (Review, (('text', 'A'),)),
+    COMMENT: (Comment, (('text', 'A'),)),
+}
+
+RESULT_FIELDS = {
+    TITLE: ('id', 'name', 'description'),
+    REVIEW: ('id', 'text', 'title_id'),
+    COMMENT: ('id', 'text', 'review_id', 'review__title_id'),
+}
+
+# Веса разделов документа как у ts_rank по умолчанию.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+WORD = re.compile(r'\w+')
+
+
+def uses_vectors():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector(kind):
+    model, fields = SEARCH_FIELDS[kind]
+    vector = None
+    for field, weight in fields:
+        part = SearchVector(field, weight=weight,
+                            config=settings.SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_vector_fields(kind):
+    """Поля для UPDATE, обновляющего tsvector объекта в PostgreSQL."""
+    if not uses_vectors():
+        return {}
+    return {'search_vector': search_vector(kind)}
+
+
+def rebuild_search_vectors():
+    if not uses_vectors():
+        index.reset()
+        return
+    for kind, (model, fields) in SEARCH_FIELDS.items():
+        model.objects.update(search_vector=search_vector(kind))
+
+
+def tokenize(text):
+    return WORD.findall((text or '').lower())
+
+
+class InvertedIndex:
+    """Инвертированный индекс в памяти процесса для баз без tsvector
+    (SQLite в тестах). Строится при первом поиске и затем обновляется
+    сигналами сохранения и удаления."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.built = False
+        self.postings = defaultdict(dict)
+        self.documents = {}
+
+    def build(self):
+        self.reset()
+        for kind, (model, fields) in SEARCH_FIELDS.items():
+            names = [field for field, weight in fields]
+            for row in model.objects.values('pk', *names).iterator():
+                self.add(kind, row['pk'], row)
+        self.built = True
+
+    def add(self, kind, pk, values):
+        model, fields = SEARCH_FIELDS[kind]
+        weights = Counter()
+        for field, weight in fields:
+            for term in tokenize(values.get(field)):
+                weights[term] += WEIGHTS[weight]
+        key = (kind, pk)
+        self.remove(kind, pk)
+        self.documents[key] = weights
+        for term, weight in weights.items():
+            self.postings[term][key] = weight
+
+    def remove(self, kind, pk):
+        key = (kind, pk)
+        for term in self.documents.pop(key, ()):
+            self.postings[term].pop(key, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def update(self, kind, instance):
+        with self.lock:
+            if self.built:
+                self.add(kind, instance.pk, instance.__dict__)
+
+    def discard(self, kind, instance):
+        with self.lock:
+            if self.built:
+                self.remove(kind, instance.pk)
+
+    def search(self, query, kinds):
+        terms = set(tokenize(query))
+        with self.lock:
+            if not self.built:
+                self.build()
+            if not terms or any(term not in self.postings for term in terms):
+                return []
+            total = len(self.documents)
+            ranks = None
+            for term in terms:
+                postings = self.postings[term]
+                idf = math.log(1 + total / len(postings))
+                term_ranks = {
+                    key: weight * idf for key, weight in postings.items()
+                    if key[0] in kinds
+                }
+                if ranks is None:
+                    ranks = term_ranks
+                else:
+                    ranks = {key: rank + term_ranks[key]
+                             for key, rank in ranks.items()
+                             if key in term_ranks}
+        return sorted(ranks.items(), key=lambda item: -item[1])
+
+
+index = InvertedIndex()
+
+
+def search(query, kinds=tuple(SEARCH_FIELDS), limit=10):
+    """Возвращает до `limit` найденных объектов, отсортированных по
+    релевантности: список словарей с полями `type`, `rank` и полями
+    из RESULT_FIELDS."""
+    results = []
+    if uses_vectors():
+        search_query = SearchQuery(query, config=settings.SEARCH_CONFIG)
+        for kind in kinds:
+            model, fields = SEARCH_FIELDS[kind]
+            rows = model.objects.filter(
+                search_vector=search_query
+            ).annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-rank', 'pk').values(
+                'rank', *RESULT_FIELDS[kind]
+            )[:limit]
+            results.extend(dict(row, type=kind) for row in rows)
+    else:
+        ranked = index.search(query, kinds)[:limit]
+        ids = defaultdict(dict)
+        for (kind, pk), rank in ranked:
+            ids[kind][pk] = rank
+        for kind, ranks in ids.items():
+            model, fields = SEARCH_FIELDS[kind]
+            rows = model.objects.filter(pk__in=ranks).values(
+                *RESULT_FIELDS[kind]
+            )
+            results.extend(
+                dict(row, type=kind, rank=ranks[row['id']]) for row in rows
+            )
+    results.sort(key=lambda row: (-row['rank'], row['type'], row['id']))
+    return results[:limit]
@@ -0,0 +1,167 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .models import (BY_CATEGORY, BY_GENRE, Category, Comment, Genre,
+                     GenreTitle, Review, Title, User)
+from .search import COMMENT, REVIEW, TITLE, index, search_vector_fields
+from .summary import (count_reviews, discount_review, drop_key,
+                      forget_title, link_genres, move_title, resync_title)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    old_title_id = getattr(instance, '_rated_title_id', None)
+    old_score = getattr(instance, '_rated_score', None)
+    titles = Title.objects.filter(pk=instance.title_id)
+    if created:
+        titles.apply_review_delta(instance.score, 1)
+        count_reviews(instance.title_id, {instance.score: 1})
+    elif old_title_id is None or old_score is None:
+        titles.rebuild_ratings()
+        resync_title(instance.title_id)
+    elif old_title_id != instance.title_id:
+        Title.objects.filter(pk=old_title_id).apply_review_delta(
+            -old_score, -1
+        )
+        titles.apply_review_delta(instance.score, 1)
+        discount_review(old_title_id, old_score)
+        count_reviews(instance.title_id, {instance.score: 1})
+    else:
+        titles.apply_review_delta(instance.score - old_score, 0)
+        if instance.score != old_score:
+            count_reviews(instance.title_id,
+                          {old_score: -1, instance.score: 1})
+    instance.remember_rating_state()
+    reviews = Review.objects.filter(pk=instance.pk)
+    if not created:
+        reviews.touch(**search_vector_fields(REVIEW))
+    elif search_vector_fields(REVIEW):
+        reviews.update(**search_vector_fields(REVIEW))
+    index.update(REVIEW, instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    title_id = getattr(instance, '_rated_title_id', None)
+    score = getattr(instance, '_rated_score', None)
+    if title_id is None or score is None:
+        title_id, score = instance.title_id, instance.score
+    Title.objects.filter(pk=title_id).apply_review_delta(-score, -1)
+    discount_review(title_id, score)
+    index.discard(REVIEW, instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).touch()
+    if search_vector_fields(COMMENT):
+        Comment.objects.filter(pk=instance.pk).update(
+            **search_vector_fields(COMMENT)
+        )
+    index.update(COMMENT, instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).touch()
+    index.discard(COMMENT, instance)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    titles = Title.objects.filter(pk=instance.pk)
+    if not created:
+        titles.touch(**search_vector_fields(TITLE))
+    elif search_vector_fields(TITLE):
+        titles.update(**search_vector_fields(TITLE))
+    index.update(TITLE, instance)
+    old_category_id = getattr(instance, '_summary_category_id', DEFERRED)
+    old_year = getattr(instance, '_summary_year', DEFERRED)
+    if not created and DEFERRED not in (old_category_id, old_year):
+        move_title(instance.pk, old_category_id, old_year,
+                   instance.category_id, instance.year)
+    instance.remember_summary_state()
+
+
+@receiver(pre_delete, sender=Title)
+def title_deleting(sender, instance, **kwargs):
+    forget_title(instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    index.discard(TITLE, instance)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_changed(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).touch()
+
+
+@receiver(post_save, sender=GenreTitle)
+def genre_title_saved(sender, instance, created, **kwargs):
+    if created:
+        link_genres([instance.title_id], [instance.genre_id])
+
+
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_deleted(sender, instance, **kwargs):
+    # remove() и clear() связи через GenreTitle удаляют ее строки
+    # queryset.delete(), который тоже посылает post_delete.
+    link_genres([instance.title_id], [instance.genre_id], -1)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if reverse and action == 'pre_clear':
+        Title.objects.filter(genre=instance).touch()
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        Title.objects.filter(pk=instance.pk).touch()
+    elif pk_set:
+        Title.objects.filter(pk__in=pk_set).touch()
+    if action == 'post_add' and pk_set:
+        if reverse:
+            link_genres(pk_set, [instance.pk])
+        else:
+            link_genres([instance.pk], pk_set)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    Title.objects.filter(genre=instance).touch()
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    drop_key(BY_CATEGORY, instance.pk)
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    drop_key(BY_GENRE, instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def user_claims_changed(sender, instance, **kwargs):
+    """Смена роли, прав или блокировка отзывает выданные токены."""
+    old_claims = getattr(instance, '_token_claims', None)
+    if old_claims is not None and old_claims != instance.get_token_claims():
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    instance.remember_token_claims()
@@ -0,0 +1,226 @@
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+
+from .models import (BY_CATEGORY, BY_GENRE, BY_TITLE, BY_YEAR, MAX_SCORE,
+                     MIN_SCORE, OVERALL, Category, Genre, GenreTitle, Review,
+                     ReviewSummary, Title)
+
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
+
+# Поле отзыва, по которому считается сводка каждого разреза.
+SCOPE_FIELDS = (
+    (BY_TITLE, 'title_id'),
+    (BY_CATEGORY, 'title__category_id'),
+    (BY_GENRE, 'title__genre'),
+    (BY_YEAR, 'title__year'),
+)
+
+
+def add_counts(deltas):
+    """Прибавляет {(scope, key, score): приращение} одним
+    INSERT ... ON CONFLICT DO UPDATE. Строки упорядочены, чтобы
+    параллельные транзакции блокировали их в одном порядке."""
+    rows = sorted(item for item in deltas.items() if item[1])
+    if not rows:
+        return
+    connection = connections[router.db_for_write(ReviewSummary)]
+    quote = connection.ops.quote_name
+    table = quote(ReviewSummary._meta.db_table)
+    scope, key, score, count = (quote(column) for column in
+                                ('scope', 'key', 'score', 'count'))
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    params = []
+    for (row_scope, row_key, row_score), delta in rows:
+        params.extend((row_scope, row_key, row_score, delta))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({scope}, {key}, {score}, {count}) '
+            f'VALUES {values} ON CONFLICT ({scope}, {key}, {score}) '
+            f'DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}',
+            params
+        )
+
+
+def title_keys(title_id):
+    """Разрезы (scope, key), в которые входят отзывы произведения,
+    кроме сводки самого произведения."""
+    title = Title.objects.filter(pk=title_id).values_list(
+        'category_id', 'year').first()
+    if title is None:
+        return []
+    category_id, year = title
+    keys = [(OVERALL, ''), (BY_YEAR, str(year))]
+    if category_id is not None:
+        keys.append((BY_CATEGORY, str(category_id)))
+    keys.extend(
+        (BY_GENRE, str(genre_id)) for genre_id in GenreTitle.objects.filter(
+            title_id=title_id).values_list('genre_id', flat=True)
+    )
+    return keys
+
+
+def title_histogram(title_ids):
+    """Суммарное число отзывов с каждой оценкой у произведений."""
+    histogram = Counter()
+    rows = ReviewSummary.objects.filter(
+        scope=BY_TITLE, key__in=[str(pk) for pk in title_ids]
+    ).values_list('score', 'count')
+    for score, count in rows:
+        histogram[score] += count
+    return histogram
+
+
+def spread(keys, histogram, sign=1):
+    return {(scope, key, score): sign * count
+            for scope, key in keys for score, count in histogram.items()}
+
+
+def count_reviews(title_id, scores):
+    """Учитывает изменение {оценка: приращение} отзывов произведения."""
+    keys = [(BY_TITLE, str(title_id))] + title_keys(title_id)
+    add_counts(spread(keys, scores))
+
+
+def discount_review(title_id, score):
+    """Вычитает удаленный отзыв. Если сводки произведения уже нет (оно
+    удаляется вместе с отзывами, см. forget_title), ничего не делает."""
+    updated = ReviewSummary.objects.filter(
+        scope=BY_TITLE, key=str(title_id), score=score, count__gt=0
+    ).update(count=F('count') - 1)
+    if updated:
+        add_counts(spread(title_keys(title_id), {score: 1}, -1))
+
+
+def resync_title(title_id):
+    """Сверяет сводку произведения с таблицей отзывов, когда прежнее
+    состояние отзыва неизвестно."""
+    actual = Counter(dict(
+        Review.objects.filter(title_id=title_id).order_by().values_list(
+            'score').annotate(total=Count('pk'))
+    ))
+    stored = title_histogram([title_id])
+    count_reviews(title_id, {
+        score: actual[score] - stored[score]
+        for score in set(actual) | set(stored)
+    })
+
+
+def forget_title(title_id):
+    histogram = title_histogram([title_id])
+    add_counts(spread(title_keys(title_id), histogram, -1))
+    ReviewSummary.objects.filter(scope=BY_TITLE, key=str(title_id)).delete()
+
+
+def move_title(title_id, old_category_id, old_year, category_id, year):
+    """Переносит отзывы произведения при смене категории или года."""
+    old_keys, new_keys = [], []
+    if old_category_id != category_id:
+        if old_category_id is not None:
+            old_keys.append((BY_CATEGORY, str(old_category_id)))
+        if category_id is not None:
+            new_keys.append((BY_CATEGORY, str(category_id)))
+    if old_year != year:
+        old_keys.append((BY_YEAR, str(old_year)))
+        new_keys.append((BY_YEAR, str(year)))
+    if not new_keys and not old_keys:
+        return
+    histogram = title_histogram([title_id])
+    deltas = spread(new_keys, histogram)
+    deltas.update(spread(old_keys, histogram, -1))
+    add_counts(deltas)
+
+
+def link_genres(title_ids, genre_ids, sign=1):
+    """Добавляет (sign=1) или вычитает (sign=-1) отзывы произведений
+    в сводках жанров."""
+    histogram = title_histogram(title_ids)
+    add_counts(spread([(BY_GENRE, str(pk)) for pk in genre_ids],
+                      histogram, sign))
+
+
+def drop_key(scope, key):
+    ReviewSummary.objects.filter(scope=scope, key=str(key)).delete()
+
+
+def actual_counts():
+    """Сводка, посчитанная заново по таблице отзывов."""
+    reviews = Review.objects.order_by()
+    counts = Counter()
+    rows = reviews.values_list('score').annotate(total=Count('pk'))
+    for score, total in rows:
+        counts[OVERALL, '', score] = total
+    for scope, field in SCOPE_FIELDS:
+        rows = reviews.filter(**{f'{field}__isnull': False}).values_list(
+            field, 'score').annotate(total=Count('pk'))
+        for key, score, total in rows:
+            counts[scope, str(key), score] = total
+    return counts
+
+
+def stored_counts():
+    return Counter({
+        (scope, key, score): count
+        for scope, key, score, count in ReviewSummary.objects.filter(
+            count__gt=0).values_list('scope', 'key', 'score', 'count')
+    })
+
+
+def rebuild_review_summary():
+    counts = actual_counts()
+    with transaction.atomic():
+        ReviewSummary.objects.all().delete()
+        ReviewSummary.objects.bulk_create([
+            ReviewSummary(scope=scope, key=key, score=score, count=count)
+            for (scope, key, score), count in counts.items()
+        ], batch_size=1000)
+    return len(counts)
+
+
+def summarize(histogram):
+    scores = {score: histogram.get(score, 0) for score in SCORES}
+    reviews_count = sum(scores.values())
+    points = sum(score * count for score, count in scores.items())
+    return {
+        'reviews_count': reviews_count,
+        'rating': (round(points / reviews_count, 2)
+                   if reviews_count else None),
+        'scores': scores,
+    }
+
+
+def title_stats(title_id):
+    return summarize(title_histogram([title_id]))
+
+
+def catalogue_stats():
+    """Статистика отзывов по категориям, жанрам и годам выпуска: читает
+    по строке на оценку каждого разреза, а не сами отзывы."""
+    histograms = defaultdict(Counter)
+    rows = ReviewSummary.objects.exclude(scope=BY_TITLE).filter(
+        count__gt=0).values_list('scope', 'key', 'score', 'count')
+    for scope, key, score, count in rows:
+        histograms[scope, key][score] += count
+
+    def named(scope, model):
+        keys = [key for key_scope, key in histograms if key_scope == scope]
+        objects = model.objects.filter(pk__in=keys).order_by(
+            'name').values_list('pk', 'name', 'slug')
+        return [
+            {'name': name, 'slug': slug,
+             **summarize(histograms[scope, str(pk)])}
+            for pk, name, slug in objects
+        ]
+
+    return {
+        'overall': summarize(histograms[OVERALL, '']),
+        'categories': named(BY_CATEGORY, Category),
+        'genres': named(BY_GENRE, Genre),
+        'years': [
+            {'year': int(key), **summarize(histograms[scope, key])}
+            for scope, key in sorted(histograms,
+                                     key=lambda item: int(item[1] or 0))
+            if scope == BY_YEAR
+        ],
+    }
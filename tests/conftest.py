@@ -1,9 +1,56 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_search_index():
+    from reviews.search import index
+    index.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_throttles():
+    from api.throttling import reset_store
+    reset_store()
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    # Постоянные соединения потоков ASGI-приложения и параллельных тестов
+    # остались бы открытыми и помешали удалить тестовую БД.
+    from django.conf import settings
+    for database in settings.DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+    # Зеркало тестовой БД - отдельное соединение, которое не видит данных
+    # из транзакции теста; test_replicas подключает свою реплику.
+    settings.DATABASE_REPLICAS = []
+
+
+@pytest.fixture(autouse=True)
+def run_on_commit(request, monkeypatch):
+    """Тест с django_db без transaction=True идет в транзакции, которая
+    откатывается, и on_commit не вызвался бы; здесь колбэки выполняются
+    сразу, как после фиксации."""
+    marker = request.node.get_closest_marker('django_db')
+    if marker is None or marker.kwargs.get('transaction') or (
+            marker.args and marker.args[0]):
+        return
+    monkeypatch.setattr('django.db.transaction.on_commit',
+                        lambda func, using=None: func())
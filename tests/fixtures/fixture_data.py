@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+    return Category.objects.create(name='Фильм', slug='films')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    from reviews.models import GenreTitle, Title
+
+    title = Title.objects.create(name='Крестный отец', year=1972,
+                                 category=category)
+    for genre in genres:
+        GenreTitle.objects.create(title=title, genre=genre)
+    return title
+
+
+@pytest.fixture
+def review(title, user):
+    from reviews.models import Review
+    return Review.objects.create(title=title, author=user, text='Отзыв',
+                                 score=8)
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='testuser@yamdb.fake', password='1234567'
+    )
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='testadmin@yamdb.fake',
+        password='1234567', role='admin'
+    )
+
+
+@pytest.fixture
+def token_user(user):
+    from api.authentication import issue_token
+    return str(issue_token(user))
+
+
+@pytest.fixture
+def user_client(token_user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_user}')
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    from rest_framework.test import APIClient
+
+    from api.authentication import issue_token
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(admin)}')
+    return client
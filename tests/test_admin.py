@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def staff_client(admin):
+    from django.test import Client
+
+    admin.is_staff = admin.is_superuser = True
+    admin.save()
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def many_titles(category, user):
+    from reviews.models import Comment, Review, Title
+
+    titles = [Title.objects.create(name=f'Произведение {index}', year=2000,
+                                   category=category)
+              for index in range(5)]
+    for title in titles:
+        review = Review.objects.create(title=title, author=user,
+                                       text='Отзыв', score=5)
+        Comment.objects.create(review=review, author=user,
+                               text='Комментарий')
+    return titles
+
+
+@pytest.mark.django_db
+class TestAdmin:
+
+    @pytest.mark.parametrize('url', [
+        '/admin/reviews/title/', '/admin/reviews/review/',
+        '/admin/reviews/comment/', '/admin/reviews/user/',
+        '/admin/reviews/review/?q=Произведение',
+        '/admin/reviews/review/add/', '/admin/reviews/comment/add/',
+    ])
+    def test_pages_query_count(self, staff_client, many_titles, url,
+                               django_assert_max_num_queries):
+        with django_assert_max_num_queries(8):
+            response = staff_client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что страницы админки открываются и не выполняют '
+            'запрос на каждую строку'
+        )
+
+    def test_estimated_count_paginator(self, many_titles):
+        from django.db import connection
+
+        from reviews.admin import EstimatedCountPaginator
+        from reviews.models import Title
+
+        paginator = EstimatedCountPaginator(Title.objects.order_by('pk'), 2)
+        assert paginator.count == 5
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE reviews_title')
+            Title.objects.filter(pk=many_titles[0].pk).delete()
+            paginator = EstimatedCountPaginator(Title.objects.order_by('pk'),
+                                                2)
+            paginator.estimate_threshold = 0
+            assert paginator.count == 5, (
+                'Проверьте, что число строк таблицы без фильтров берется из '
+                'pg_class.reltuples'
+            )
+        paginator = EstimatedCountPaginator(
+            Title.objects.filter(name__startswith='Произведение').order_by(
+                'pk'), 2)
+        paginator.estimate_threshold = 0
+        assert paginator.estimate_count() is None
+        assert paginator.count == len(many_titles) - (
+            connection.vendor == 'postgresql'), (
+            'Проверьте, что отфильтрованный список считается точно'
+        )
+        assert EstimatedCountPaginator(list(range(5)), 2).count == 5
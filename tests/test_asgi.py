@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+async def asgi_get(application, path):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application({
+        'type': 'http', 'http_version': '1.1', 'method': 'GET',
+        'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'scheme': 'http', 'query_string': b'', 'headers': [],
+        'client': ('127.0.0.1', 5000), 'server': ('testserver', 80),
+    }, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages
+                    if message['type'] == 'http.response.body')
+    return messages[0]['status'], body
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asgi_application_serves_concurrent_requests(title):
+    from api_yamdb.asgi import application
+
+    async def run():
+        return await asyncio.gather(*(
+            asgi_get(application, f'/api/v1/titles/{title.id}/')
+            for _ in range(4)
+        ))
+
+    for status, body in asyncio.run(run()):
+        assert status == 200, (
+            'Проверьте, что ASGI-приложение отвечает на запросы к API'
+        )
+        assert json.loads(body)['name'] == title.name
+
+
+def test_asgiref_run_wsgi_app_shape():
+    from asgiref.sync import SyncToAsync
+    from asgiref.wsgi import WsgiToAsgiInstance
+
+    run_wsgi_app = WsgiToAsgiInstance.__dict__.get('run_wsgi_app')
+    assert isinstance(run_wsgi_app, SyncToAsync), (
+        'asgiref изменил WsgiToAsgiInstance.run_wsgi_app: '
+        'проверьте ThreadPoolWsgiInstance в asgi.py'
+    )
+    assert run_wsgi_app.func.__code__.co_varnames[:2] == ('self', 'body')
+
+
+def test_wsgi_app_runs_in_thread_pool():
+    from api_yamdb.asgi import ThreadPoolWsgiToAsgi
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    class Response(list):
+        def close(self):
+            pass
+
+    def wsgi_application(environ, start_response):
+        # Оба запроса доходят сюда, только если выполняются одновременно.
+        barrier.wait()
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return Response([b'ok'])
+
+    application = ThreadPoolWsgiToAsgi(wsgi_application)
+
+    async def run():
+        return await asyncio.gather(
+            asgi_get(application, '/'), asgi_get(application, '/')
+        )
+
+    assert asyncio.run(run()) == [(200, b'ok')] * 2, (
+        'Проверьте, что ASGI-приложение выполняет запросы в пуле потоков'
+    )
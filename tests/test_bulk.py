@@ -0,0 +1,182 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestBulkCreate:
+
+    def test_titles(self, admin_client, client, category, genres,
+                    django_assert_max_num_queries):
+        from django.db import connection
+
+        from reviews.models import GenreTitle, Title
+
+        items = [
+            {'name': f'Сериал {index}', 'year': 2000 + index,
+             'genre': ['drama', 'comedy'], 'category': 'films'}
+            for index in range(20)
+        ]
+        items[3]['genre'] = ['drama', 'western']
+        items[5]['year'] = 3000
+        items.append('не объект')
+        queries = 10 if connection.vendor == 'postgresql' else 100
+        with django_assert_max_num_queries(queries):
+            response = admin_client.post('/api/v1/titles/', items,
+                                         format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что POST списка на `/api/v1/titles/` создает '
+            'произведения пакетом'
+        )
+        data = response.json()
+        assert [error['index'] for error in data['errors']] == [3, 5, 20], (
+            'Проверьте, что ошибки возвращаются по номерам элементов, '
+            'не прерывая пакет'
+        )
+        assert 'genre' in data['errors'][0]['errors']
+        assert len(data['results']) == 18
+        assert data['results'][0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]
+        assert data['results'][0]['category']['slug'] == 'films'
+        assert Title.objects.count() == 18
+        assert GenreTitle.objects.count() == 36
+
+        response = client.get('/api/v1/search/', {'q': 'сериал 19'})
+        assert [item['text'] for item in response.json()] == [
+            'Сериал 19'], (
+            'Проверьте, что созданные пакетом произведения находит поиск'
+        )
+
+    def test_titles_all_invalid(self, admin_client):
+        response = admin_client.post('/api/v1/titles/', [{'name': 'Без'}],
+                                     format='json')
+        assert response.status_code == 400
+        assert response.json()['results'] == []
+
+    def test_batch_limit(self, admin_client, settings):
+        settings.API_BULK_MAX_ITEMS = 1
+        response = admin_client.post(
+            '/api/v1/genres/', [{'name': 'А', 'slug': 'a'}] * 2,
+            format='json'
+        )
+        assert response.status_code == 400
+
+    def test_requires_admin(self, user_client):
+        response = user_client.post(
+            '/api/v1/genres/', [{'name': 'Вестерн', 'slug': 'western'}],
+            format='json'
+        )
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize('url, name, slug', [
+        ('/api/v1/genres/', 'Драма', 'drama'),
+        ('/api/v1/categories/', 'Фильм', 'films'),
+    ])
+    def test_classifications(self, admin_client, genres, category, url,
+                             name, slug):
+        admin_client.get(url)
+        response = admin_client.post(url, [
+            {'name': name, 'slug': 'new'},
+            {'name': 'Новое', 'slug': slug},
+            {'name': 'Вестерн', 'slug': 'western'},
+            {'name': 'Вестерн 2', 'slug': 'western'},
+            {'name': 'Нуар', 'slug': 'не слаг'},
+        ], format='json')
+        assert response.status_code == 201
+        data = response.json()
+        assert data['results'] == [{'name': 'Вестерн', 'slug': 'western'}]
+        errors = {error['index']: set(error['errors'])
+                  for error in data['errors']}
+        assert errors[3] == {'slug'} and errors[4] == {'slug'}
+        assert 0 in errors and 1 in errors
+        names = [item['name'] for item in admin_client.get(url).json()[
+            'results']]
+        assert 'Вестерн' in names, (
+            'Проверьте, что пакетное создание сбрасывает кэш списка'
+        )
+
+    @pytest.mark.parametrize('path', ['bulk_create', 'save'])
+    def test_titles_are_indexed_and_summarized(self, admin_client, client,
+                                               user, category, genres,
+                                               path, monkeypatch):
+        from django.db import connection
+
+        from reviews.models import Review, Title
+        from reviews.summary import actual_counts, stored_counts
+
+        if path == 'save':
+            monkeypatch.setattr(connection.features,
+                                'can_return_ids_from_bulk_insert', False)
+        elif not connection.features.can_return_ids_from_bulk_insert:
+            pytest.skip('bulk_create не возвращает первичные ключи')
+        response = admin_client.post('/api/v1/titles/', [
+            {'name': 'Пакетный вестерн', 'year': 1966,
+             'genre': ['drama', 'comedy'], 'category': 'films'},
+            {'name': 'Пакетная драма', 'year': 1972, 'genre': ['drama']},
+        ], format='json')
+        assert response.status_code == 201
+        ids = [row['id'] for row in response.json()['results']]
+
+        response = client.get('/api/v1/search/', {'q': 'вестерн'})
+        assert [item['text'] for item in response.json()] == [
+            'Пакетный вестерн'], (
+            'Проверьте, что созданные пакетом произведения попадают в '
+            'поисковый индекс'
+        )
+        for title_id, score in zip(ids, (9, 4)):
+            Review.objects.create(title_id=title_id, author=user,
+                                  text='Отзыв', score=score)
+        assert stored_counts() == actual_counts(), (
+            'Проверьте, что сводка по жанрам и категориям учитывает '
+            'произведения, созданные пакетом'
+        )
+        stats = client.get('/api/v1/titles/stats/').json()
+        genres_count = {genre['slug']: genre['reviews_count']
+                        for genre in stats['genres']}
+        assert genres_count == {'drama': 2, 'comedy': 1}
+        assert [(row['slug'], row['reviews_count'])
+                for row in stats['categories']] == [('films', 1)]
+        assert Title.objects.filter(pk__in=ids).count() == 2
+
+
+@pytest.mark.django_db
+class TestBulkUpdate:
+    url = '/api/v1/titles/bulk/'
+
+    def test_update(self, admin_client, client, title, review, genres):
+        from reviews.models import Category, Title
+        from reviews.summary import actual_counts, stored_counts
+
+        other = Title.objects.create(name='Другое', year=1990)
+        Category.objects.create(name='Книга', slug='books')
+        client.get(f'/api/v1/titles/{title.id}/')
+        response = admin_client.patch(self.url, [
+            {'id': title.id, 'name': 'Крестный отец 2', 'year': 1974,
+             'category': 'books', 'genre': ['comedy']},
+            {'id': other.id, 'description': 'Описание'},
+            {'id': 100500, 'name': 'Нет такого'},
+            {'name': 'Без id'},
+            {'id': other.id, 'category': 'nothing'},
+        ], format='json')
+        assert response.status_code == 200, (
+            'Проверьте, что PATCH списка на `/api/v1/titles/bulk/` '
+            'обновляет произведения'
+        )
+        data = response.json()
+        assert [error['index'] for error in data['errors']] == [2, 3, 4]
+        assert [row['id'] for row in data['results']] == [title.id,
+                                                          other.id]
+        detail = client.get(f'/api/v1/titles/{title.id}/').json()
+        assert detail['name'] == 'Крестный отец 2'
+        assert detail['year'] == 1974
+        assert detail['category']['slug'] == 'books'
+        assert [genre['slug'] for genre in detail['genre']] == ['comedy']
+        assert Title.objects.get(pk=other.id).description == 'Описание'
+        assert stored_counts() == actual_counts(), (
+            'Проверьте, что пакетное обновление поддерживает сводку отзывов'
+        )
+
+    def test_requires_list(self, admin_client, title):
+        response = admin_client.patch(self.url, {'id': title.id},
+                                      format='json')
+        assert response.status_code == 400
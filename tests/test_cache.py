@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_repeated_list_skips_db(self, client, title):
+        url = '/api/v1/titles/'
+        first = client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            second = client.get(url)
+        assert second.json() == first.json()
+        assert not context.captured_queries, (
+            'Проверьте, что повторный запрос списка произведений '
+            'отдается из кэша без обращения к БД'
+        )
+
+    def test_review_invalidates_title(self, client, title, user):
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).json()['rating'] is None
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'rating'] is None
+        Review.objects.create(title=title, author=user, text='Отзыв',
+                              score=7)
+        assert client.get(url).json()['rating'] == 7, (
+            'Проверьте, что новый отзыв сбрасывает кэш произведения'
+        )
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'rating'] == 7
+
+    def test_category_rename_invalidates_titles(self, client, title,
+                                                category):
+        client.get('/api/v1/titles/')
+        category.name = 'Кино'
+        category.save()
+        response = client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['category']['name'] == 'Кино'
+
+
+@pytest.mark.django_db
+def test_cache_key_includes_host(client, category):
+    from reviews.models import Title
+
+    Title.objects.bulk_create([Title(name=f'Фильм {index}', year=2000)
+                               for index in range(12)])
+    url = '/api/v1/titles/'
+    client.get(url, HTTP_HOST='web:8000')
+    response = client.get(url, HTTP_HOST='yamdb.example')
+    assert response.json()['next'].startswith('http://yamdb.example/'), (
+        'Проверьте, что ответ, построенный для другого хоста, не берется '
+        'из кэша'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalidation_after_commit(client, title):
+    from django.db import transaction
+
+    from api.cache import TITLES, generation_key, get_cache, get_generations
+
+    get_generations([TITLES])
+    before = get_cache().get(generation_key(TITLES))
+    with transaction.atomic():
+        title.name = 'Новое название'
+        title.save()
+        assert get_cache().get(generation_key(TITLES)) == before, (
+            'Проверьте, что кэш сбрасывается только после фиксации '
+            'транзакции'
+        )
+    assert get_cache().get(generation_key(TITLES)) != before
@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_title_not_modified(self, client, title):
+        url = f'/api/v1/titles/{title.id}/'
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении If-None-Match возвращается 304'
+        )
+        assert len(context.captured_queries) == 1
+
+    def test_new_review_changes_etags(self, client, title, review,
+                                      django_user_model):
+        from reviews.models import Review
+
+        title_url = f'/api/v1/titles/{title.id}/'
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        title_etag = client.get(title_url)['ETag']
+        reviews_etag = client.get(reviews_url)['ETag']
+        author = django_user_model.objects.create(username='other',
+                                                  email='other@ya.ru')
+        Review.objects.create(title=title, author=author, text='Еще',
+                              score=2)
+        assert client.get(
+            title_url, HTTP_IF_NONE_MATCH=title_etag).status_code == 200
+        assert client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=reviews_etag).status_code == 200
+
+    def test_comment_changes_review_etag(self, client, review, user):
+        from reviews.models import Comment
+
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}/'
+               f'comments/')
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        Comment.objects.create(review=review, author=user, text='Да')
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
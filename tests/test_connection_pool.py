@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Пул соединений работает только с PostgreSQL'
+)
+
+
+@pytest.fixture
+def make_pool():
+    from functools import partial
+
+    import psycopg2
+
+    from api_yamdb.postgresql_pool.pool import ConnectionPool
+
+    pools = []
+
+    def make(**options):
+        connect = partial(psycopg2.connect,
+                          **connection.get_connection_params())
+        pool = ConnectionPool(connect, **options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def backend_pid(raw):
+    with raw.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+class TestConnectionPool:
+
+    def test_reuse_and_max_size(self, make_pool):
+        from api_yamdb.postgresql_pool.pool import PoolTimeout
+
+        pool = make_pool(max_size=1, timeout=0.05)
+        raw = pool.checkout()
+        with pytest.raises(PoolTimeout):
+            pool.checkout()
+        pool.checkin(raw)
+        assert pool.checkout() is raw, (
+            'Проверьте, что возвращенное соединение выдается снова'
+        )
+        assert pool.size == 1
+
+    def test_waiting_thread_gets_returned_connection(self, make_pool):
+        pool = make_pool(max_size=1, timeout=5)
+        raw = pool.checkout()
+        received = []
+        waiter = threading.Thread(
+            target=lambda: received.append(pool.checkout())
+        )
+        waiter.start()
+        time.sleep(0.05)
+        pool.checkin(raw)
+        waiter.join(5)
+        assert received == [raw]
+
+    def test_health_check(self, make_pool):
+        pool = make_pool(health_check_after=0)
+        raw = pool.checkout()
+        pid = backend_pid(raw)
+        pool.checkin(raw)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        time.sleep(0.05)
+        fresh = pool.checkout()
+        assert fresh is not raw, (
+            'Проверьте, что оборванное соединение не выдается из пула'
+        )
+        assert backend_pid(fresh) != pid
+        assert pool.size == 1
+
+    def test_checkin_transaction_and_closed(self, make_pool):
+        pool = make_pool()
+        raw = pool.checkout()
+        with raw.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        pool.checkin(raw)
+        assert pool.checkout() is raw, (
+            'Проверьте, что соединение в транзакции откатывается и '
+            'возвращается в пул'
+        )
+        raw.close()
+        pool.checkin(raw)
+        assert pool.size == 0 and not pool.idle
+
+    def test_reap(self, make_pool):
+        pool = make_pool(max_idle=60)
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        pool.checkin(second)
+        pool.idle[0] = (first, time.monotonic() - 61)
+        assert pool.reap() == 1
+        assert first.closed and not second.closed
+        assert pool.size == 1
+
+
+@pytest.mark.django_db
+def test_database_wrapper_uses_pool():
+    from api_yamdb.postgresql_pool.base import DatabaseWrapper
+    from api_yamdb.postgresql_pool.pool import close_pools
+
+    settings_dict = dict(connection.settings_dict, POOL={'MAX_SIZE': 2})
+    wrapper = DatabaseWrapper(settings_dict, alias='pooled')
+    try:
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        assert not raw.closed, (
+            'Проверьте, что закрытие соединения возвращает его в пул'
+        )
+        wrapper.ensure_connection()
+        assert wrapper.connection is raw
+
+        wrapper.close()
+        wrappers = []
+        barrier = threading.Barrier(6)
+
+        def work():
+            thread_wrapper = DatabaseWrapper(settings_dict, alias='pooled')
+            barrier.wait()
+            for _ in range(5):
+                with thread_wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                wrappers.append(thread_wrapper.pool)
+                thread_wrapper.close()
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert len(wrappers) == 30
+        assert wrappers[0].size <= 2, (
+            'Проверьте, что потоки делят не больше MAX_SIZE соединений'
+        )
+    finally:
+        close_pools(settings_dict['NAME'])
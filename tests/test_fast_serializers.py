@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def catalogue(title, review, django_user_model):
+    from reviews.models import Comment, Review, Title
+
+    other = django_user_model.objects.create(username='other',
+                                             email='other@ya.ru')
+    Review.objects.create(title=title, author=other, text='Второй', score=3)
+    Title.objects.create(name='Без категории', year=2000,
+                         description='Описание')
+    for index in range(3):
+        Comment.objects.create(review=review, author=other,
+                               text=f'Комментарий {index}')
+    return title, review
+
+
+def get_both(client, settings, url):
+    settings.API_CACHE_TIMEOUT = 0
+    responses = []
+    for fast in (False, True):
+        settings.API_FAST_SERIALIZERS = fast
+        response = client.get(url)
+        assert response.status_code == 200
+        responses.append(json.loads(response.content))
+    return responses
+
+
+@pytest.mark.django_db
+class TestFastSerializers:
+
+    @pytest.mark.parametrize('query', [
+        '', '?cursor=', '?ordering=-rating', '?genre=drama', '?page=1',
+    ])
+    def test_titles_list(self, client, settings, catalogue, query):
+        slow, fast = get_both(client, settings, f'/api/v1/titles/{query}')
+        assert fast == slow, (
+            'Проверьте, что быстрый путь списка произведений возвращает '
+            'те же данные, что и TitleViewSerializer'
+        )
+        assert slow['results']
+
+    @pytest.mark.parametrize('query', ['', '?cursor='])
+    def test_reviews_list(self, client, settings, catalogue, query):
+        title, review = catalogue
+        slow, fast = get_both(client, settings,
+                              f'/api/v1/titles/{title.id}/reviews/{query}')
+        assert fast == slow
+        assert len(slow['results']) == 2
+
+    @pytest.mark.parametrize('query', ['', '?cursor='])
+    def test_comments_list(self, client, settings, catalogue, query):
+        title, review = catalogue
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        slow, fast = get_both(client, settings, f'{url}{query}')
+        assert fast == slow
+        assert len(slow['results']) == 3
+
+    def test_cursor_next_page(self, client, settings, catalogue):
+        from rest_framework.settings import api_settings
+
+        from reviews.models import Title
+
+        for index in range(api_settings.PAGE_SIZE):
+            Title.objects.create(name=f'Серия {index}', year=2001)
+        slow, fast = get_both(client, settings, '/api/v1/titles/?cursor=')
+        assert fast['next'] == slow['next']
+        next_slow, next_fast = get_both(client, settings, slow['next'])
+        assert next_fast == next_slow
@@ -0,0 +1,100 @@
+from io import StringIO
+
+import pytest
+
+DATE = '2020-01-01T00:00:00Z'
+
+SOURCES = {
+    'category.csv': ['id,name,slug', '1,Фильм,films'],
+    'genre.csv': ['id,name,slug', '1,Драма,drama', '2,Вторая драма,drama'],
+    'users.csv': ['id,username,email,role',
+                  '1,alice,alice@yamdb.fake,user',
+                  '2,bob,bob@yamdb.fake,user'],
+    'titles.csv': ['id,name,year,category', '1,Первое,1990,1',
+                   '3,Без категории,2000,99'],
+    'review.csv': ['id,title_id,text,author,score,pub_date',
+                   f'1,1,Хорошо,1,8,{DATE}',
+                   f'2,1,Второй отзыв автора,1,5,{DATE}',
+                   f'4,1,Отзыв Боба,2,7,{DATE}'],
+    'comments.csv': ['id,review_id,text,author,pub_date',
+                     f'1,1,Согласен,2,{DATE}',
+                     f'2,2,К отброшенному отзыву,1,{DATE}'],
+    'genre_title.csv': ['id,title_id,genre_id', '1,1,1', '2,1,1'],
+}
+
+MALFORMED = {
+    'category.csv': [f'2,Длинный слаг,{"s" * 51}'],
+    'titles.csv': ['2,Год словами,тысяча,1', '5,Короткая строка'],
+    'review.csv': [f'3,1,Оценка вне шкалы,2,42,{DATE}',
+                   '5,1,Несуществующая дата,2,6,2020-02-30T00:00:00Z',
+                   f'6,1,Автор по имени,bob,6,{DATE}'],
+}
+
+
+def write_sources(directory, extra=None):
+    for name, lines in SOURCES.items():
+        lines = lines + (extra or {}).get(name, [])
+        (directory / name).write_text('\n'.join(lines) + '\n',
+                                      encoding='utf-8')
+    return str(directory)
+
+
+def import_csv(directory, *args):
+    from django.core.management import call_command
+
+    output = StringIO()
+    call_command('importcsv', '--source-dir', directory, '--batch-size',
+                 '2', *args, stdout=output)
+    return output.getvalue()
+
+
+def assert_imported():
+    from reviews.models import Comment, Genre, GenreTitle, Review, Title
+
+    assert sorted(Title.objects.values_list('pk', flat=True)) == [1]
+    assert sorted(Review.objects.values_list('pk', flat=True)) == [1, 4]
+    assert list(Comment.objects.values_list('pk', flat=True)) == [1], (
+        'Проверьте, что строки, ссылающиеся на отброшенные конфликтом '
+        'объекты, пропускаются'
+    )
+    assert Genre.objects.count() == 1
+    assert GenreTitle.objects.count() == 1
+    title = Title.objects.get()
+    assert (title.reviews_count, title.scores_sum) == (2, 15)
+
+
+@pytest.mark.django_db
+class TestImportCSV:
+
+    @pytest.mark.parametrize('engine', ['batch', 'copy'])
+    def test_counts(self, tmp_path, engine):
+        output = import_csv(write_sources(tmp_path), '--engine', engine)
+        assert_imported()
+        assert ('2 malformed rows or rows with unknown foreign keys are '
+                'skipped') in output
+        assert ('3 rows conflicting with existing ids or unique values '
+                'are skipped') in output, (
+            'Проверьте, что строки, отброшенные ограничениями '
+            'уникальности, попадают в отчет'
+        )
+        assert 'review.csv: 2 rows' in output
+
+    @pytest.mark.parametrize('engine', ['batch', 'copy'])
+    def test_malformed_rows(self, tmp_path, engine):
+        output = import_csv(write_sources(tmp_path, MALFORMED), '--engine',
+                            engine)
+        assert_imported()
+        assert ('8 malformed rows or rows with unknown foreign keys are '
+                'skipped') in output, (
+            'Проверьте, что строки с некорректными значениями '
+            'пропускаются и учитываются'
+        )
+
+    def test_repeated_import(self, tmp_path):
+        directory = write_sources(tmp_path)
+        import_csv(directory)
+        output = import_csv(directory)
+        assert_imported()
+        assert 'review.csv: 0 rows' in output
+        assert ('12 rows conflicting with existing ids or unique values '
+                'are skipped') in output
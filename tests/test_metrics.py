@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def metrics_token(settings):
+    settings.METRICS_TOKEN = 'secret'
+
+
+def get_metrics(client):
+    return client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+
+@pytest.fixture(autouse=True)
+def metrics_registry():
+    from api.metrics import registry
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+def parse_server_timing(header):
+    timings = {}
+    for part in header.split(', '):
+        name, *params = part.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_server_timing(self, client, title, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        settings.API_CACHE_TIMEOUT = 0
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert 'Server-Timing' in response, (
+            'Проверьте, что ответы содержат заголовок Server-Timing'
+        )
+        timings = parse_server_timing(response['Server-Timing'])
+        assert set(timings) == {'db', 'serialize', 'total'}
+        assert timings['db']['desc'] == f'"{len(queries)} queries"'
+        assert float(timings['serialize']['dur']) > 0
+        assert (float(timings['total']['dur'])
+                >= float(timings['db']['dur']))
+
+    def test_metrics_endpoint(self, client, title, review):
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.id}/reviews/')
+        client.get(f'/api/v1/titles/{title.id}/reviews/')
+        response = get_metrics(client)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert '# TYPE api_request_db_queries histogram' in text
+        assert ('api_request_duration_seconds_count{view="reviews-list",'
+                f'method="GET",worker="{os.getpid()}"}} 2') in text, (
+            'Проверьте, что /metrics отдает гистограммы по имени '
+            'представления'
+        )
+        assert 'view="title-list"' in text
+
+    def test_unknown_methods_share_series(self, client):
+        for method in ('BREW', 'PROPFIND'):
+            client.generic(method, '/api/v1/categories/')
+        text = get_metrics(client).content.decode()
+        assert ('api_request_duration_seconds_count{view="category-list",'
+                f'method="other",worker="{os.getpid()}"}} 2') in text, (
+            'Проверьте, что нестандартные методы попадают в серию "other"'
+        )
+        assert 'BREW' not in text
+
+    def test_metrics_token(self, client, settings):
+        assert client.get('/metrics').status_code == 403
+        assert get_metrics(client).status_code == 200
+        settings.METRICS_TOKEN = ''
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+        assert response.status_code == 403, (
+            'Проверьте, что без METRICS_TOKEN /metrics закрыт'
+        )
+
+    def test_disabled(self, client, settings):
+        settings.API_METRICS = False
+        response = client.get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
+
+    def test_log_line(self, client, caplog):
+        import json
+        import logging
+
+        with caplog.at_level(logging.INFO, logger='api.metrics'):
+            client.get('/api/v1/categories/')
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['view'] == 'category-list'
+        assert record['status'] == 200
+        assert {'total_ms', 'db_ms', 'queries', 'serialize_ms'} <= set(
+            record)
+
+
+def test_timed_counts_nested_blocks_once():
+    from api.metrics import RequestMetrics, current, timed
+
+    metrics = RequestMetrics()
+    token = current.set(metrics)
+    try:
+        with timed('serialize'):
+            with timed('serialize'):
+                pass
+        with timed('serialize'):
+            pass
+    finally:
+        current.reset(token)
+    assert 0 < metrics.phases['serialize'] < 1
+    assert metrics.depth['serialize'] == 0
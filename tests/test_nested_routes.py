@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def other_title():
+    from reviews.models import Title
+    return Title.objects.create(name='Другое', year=1990)
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    def test_duplicate_review(self, user_client, title, review):
+        response = user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                                    {'text': 'Еще раз', 'score': 3})
+        assert response.status_code == 400, (
+            'Проверьте, что второй отзыв автора на произведение '
+            'отклоняется с кодом 400'
+        )
+        assert response.json() == {'non_field_errors': [
+            'Вы уже оставили отзыв на данное произведение']}
+
+    def test_missing_parents(self, user_client, title, review, other_title):
+        urls = [
+            '/api/v1/titles/100500/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/100500/comments/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/',
+        ]
+        for url in urls:
+            assert user_client.get(url).status_code == 404, (
+                f'Проверьте, что `{url}` отвечает 404'
+            )
+            response = user_client.post(url, {'text': 'Текст', 'score': 5})
+            assert response.status_code == 404
+
+    def test_comment_of_other_title(self, user_client, title, review,
+                                    other_title, user):
+        from reviews.models import Comment
+
+        comment = Comment.objects.create(review=review, author=user,
+                                         text='Комментарий')
+        url = (f'/api/v1/titles/{other_title.id}/reviews/{review.id}/'
+               f'comments/{comment.id}/')
+        assert user_client.get(url).status_code == 404
+        assert user_client.patch(url, {'text': 'Новый'}).status_code == 404
+        assert user_client.delete(url).status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_review_for_missing_title_outside_transaction(user_client):
+    from reviews.models import Review
+
+    response = user_client.post('/api/v1/titles/100500/reviews/',
+                                {'text': 'Текст', 'score': 5})
+    assert response.status_code == 404, (
+        'Проверьте, что отзыв на несуществующее произведение отклоняется '
+        'внешним ключом с кодом 404'
+    )
+    assert not Review.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_review_query_count(admin_client, title, admin,
+                                   django_assert_max_num_queries):
+    from reviews.models import Review
+
+    url = f'/api/v1/titles/{title.id}/reviews/'
+    # INSERT отзыва и пять запросов сигналов: рейтинг, сводка, поиск.
+    with django_assert_max_num_queries(6):
+        response = admin_client.post(url, {'text': 'Хорошо', 'score': 7})
+    assert response.status_code == 201, (
+        'Проверьте, что отзыв создается без выборки произведения и '
+        'автора'
+    )
+    assert response.json()['author'] == admin.username
+    assert Review.objects.get(pk=response.json()['id']).author == admin
@@ -0,0 +1,160 @@
+import io
+import smtplib
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+
+def queue_emails(count):
+    from reviews.models import OutgoingEmail
+
+    return [
+        OutgoingEmail.objects.create(
+            subject='Тема', body='Текст', from_email='no-reply@yamdb.fake',
+            recipient=f'user{number}@yamdb.fake'
+        )
+        for number in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_queues_email(self, client, settings):
+        from reviews.models import PENDING, SENT, OutgoingEmail
+
+        settings.EMAIL_OUTBOX = True
+        response = client.post('/api/v1/auth/signup/', {
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+        assert response.status_code == 200
+        assert not mail.outbox, (
+            'Проверьте, что письмо не отправляется во время запроса'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.status == PENDING
+        assert email.recipient == 'newbie@yamdb.fake'
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == 1
+        email.refresh_from_db()
+        assert email.status == SENT
+
+    def test_failed_delivery_is_retried_with_backoff(self, settings):
+        from reviews.models import FAILED, PENDING, OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_outbox.BrokenBackend'
+        email = OutgoingEmail.objects.create(
+            subject='Тема', body='Текст', from_email='no-reply@yamdb.fake',
+            recipient='user@yamdb.fake'
+        )
+        call_command('send_outbox', max_attempts=2, backoff=30)
+        email.refresh_from_db()
+        assert email.status == PENDING
+        assert email.attempts == 1
+        assert email.last_error
+        assert email.next_attempt > timezone.now(), (
+            'Проверьте, что повторная отправка откладывается'
+        )
+
+        email.next_attempt = timezone.now()
+        email.save()
+        call_command('send_outbox', max_attempts=2, backoff=30)
+        email.refresh_from_db()
+        assert email.status == FAILED
+        assert email.attempts == 2
+
+    def test_unavailable_server_keeps_emails_queued(self, settings):
+        from reviews.models import PENDING, OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_outbox.UnreachableBackend'
+        queue_emails(3)
+        stderr = io.StringIO()
+        call_command('send_outbox', backoff=30, stderr=stderr)
+        assert 'Mail server is unavailable' in stderr.getvalue()
+        for email in OutgoingEmail.objects.all():
+            assert email.status == PENDING
+            assert email.attempts == 0, (
+                'Проверьте, что недоступность сервера не тратит попытки'
+            )
+            assert email.next_attempt > timezone.now(), (
+                'Проверьте, что письма возвращаются в очередь с задержкой'
+            )
+
+    def test_connection_is_reopened_after_failure(self, settings):
+        from reviews.models import PENDING, SENT, OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FlakyBackend'
+        FlakyBackend.opened = 0
+        first, second, third = queue_emails(3)
+        call_command('send_outbox', batch_size=10)
+        statuses = dict(OutgoingEmail.objects.values_list('pk', 'status'))
+        assert statuses == {
+            first.pk: SENT, second.pk: PENDING, third.pk: SENT
+        }, 'Проверьте, что после обрыва соединения пачка отправляется дальше'
+        assert FlakyBackend.opened == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_emails_are_sent_outside_transaction(settings):
+    from reviews.models import SENT, OutgoingEmail
+
+    settings.EMAIL_BACKEND = 'tests.test_outbox.TransactionCheckBackend'
+    queue_emails(2)
+    call_command('send_outbox')
+    assert set(OutgoingEmail.objects.values_list('status', flat=True)) == {
+        SENT
+    }
+
+
+class BrokenBackend:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP is unavailable')
+
+
+class UnreachableBackend(BrokenBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP is unavailable')
+
+
+class FlakyBackend(BrokenBackend):
+    """Соединение обрывается на втором письме и работает после
+    переоткрытия."""
+
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        self.sent = 0
+        self.broken = False
+
+    def send_messages(self, messages):
+        if self.broken or (FlakyBackend.opened == 1 and self.sent == 1):
+            self.broken = True
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly '
+                                                 'closed')
+        self.sent += 1
+        return len(messages)
+
+
+class TransactionCheckBackend(BrokenBackend):
+
+    def send_messages(self, messages):
+        assert not connection.in_atomic_block, (
+            'Проверьте, что письма отправляются вне транзакции'
+        )
+        return len(messages)
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def create_reviews(self, title, django_user_model, count):
+        from django.utils import timezone
+        from reviews.models import Review
+
+        pub_date = timezone.now()
+        for index in range(count):
+            author = django_user_model.objects.create(
+                username=f'reviewer{index}', email=f'reviewer{index}@ya.ru'
+            )
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=5,
+                pub_date=pub_date + timedelta(minutes=index // 3)
+            )
+
+    def test_page_number_is_default(self, client, title, django_user_model):
+        self.create_reviews(title, django_user_model, 3)
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 3, (
+            'Проверьте, что без параметра `cursor` используется пагинация '
+            'по номеру страницы'
+        )
+
+    def test_cursor_walks_all_reviews(self, client, title,
+                                      django_user_model):
+        self.create_reviews(title, django_user_model, 25)
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        seen = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data
+            seen.extend(review['id'] for review in data['results'])
+            url = data['next']
+        expected = list(title.reviews.order_by('pub_date', 'id')
+                        .values_list('id', flat=True))
+        assert seen == expected, (
+            'Проверьте, что курсорная пагинация отдает все отзывы по порядку '
+            'без пропусков и повторов'
+        )
+
+    def test_invalid_cursor(self, client, title):
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=broken'
+        )
+        assert response.status_code == 404
+
+    def test_ordering_with_cursor(self, client, title):
+        from reviews.models import Title
+
+        Title.objects.create(name='Аэроплан', year=1980)
+        response = client.get('/api/v1/titles/?cursor=&ordering=-year')
+        assert response.status_code == 400, (
+            'Проверьте, что `ordering` вместе с `cursor` отклоняется, а не '
+            'подменяется порядком курсора'
+        )
+        assert 'ordering' in response.json()
+        response = client.get('/api/v1/titles/?ordering=-year')
+        assert response.status_code == 200
+        assert [item['year'] for item in response.json()['results']] == [
+            1980, 1972]
+        assert client.get('/api/v1/titles/?cursor=').status_code == 200
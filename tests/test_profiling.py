@@ -0,0 +1,148 @@
+import io
+import json
+import marshal
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def profile_rate(settings):
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = {'profile': '2/hour'}
+    settings.REST_FRAMEWORK = rest_framework
+
+
+def read_archive(response):
+    return zipfile.ZipFile(io.BytesIO(b''.join(response)))
+
+
+@pytest.mark.django_db
+class TestProfiler:
+    url = '/api/v1/titles/'
+
+    def test_pstats(self, admin_client, title):
+        admin_client.get(self.url)
+        response = admin_client.get(self.url, {'profile': 'pstats'})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/zip', (
+            'Проверьте, что запрос администратора с ?profile=pstats '
+            'возвращает архив с профилем'
+        )
+        assert response['X-Profile-Status'] == '200'
+        archive = read_archive(response)
+        assert set(archive.namelist()) == {'profile.prof', 'queries.json'}
+        stats = marshal.loads(archive.read('profile.prof'))
+        assert any(function == 'dispatch'
+                   for _, _, function in stats)
+        summary = json.loads(archive.read('queries.json'))
+        assert summary['status'] == 200
+        assert summary['queries'], (
+            'Проверьте, что профиль не берется из кэша и содержит '
+            'выполненные запросы к БД'
+        )
+        assert any('reviews_title' in query['sql']
+                   for query in summary['queries'])
+
+    def test_speedscope_header(self, admin_client, title, settings):
+        settings.PROFILER_SAMPLE_INTERVAL = 0.0001
+        response = admin_client.get(self.url, HTTP_X_PROFILE='speedscope')
+        archive = read_archive(response)
+        profile = json.loads(archive.read('profile.speedscope.json'))
+        sampled = profile['profiles'][0]
+        assert sampled['type'] == 'sampled'
+        assert len(sampled['samples']) == len(sampled['weights'])
+        frames = profile['shared']['frames']
+        for stack in sampled['samples']:
+            assert all(0 <= index < len(frames) for index in stack)
+
+    def test_not_admin(self, client, user_client, title):
+        for api_client in (client, user_client):
+            response = api_client.get(self.url, {'profile': 'pstats'})
+            assert response.status_code == 200
+            assert response['Content-Type'] == 'application/json', (
+                'Проверьте, что флаг профилирования игнорируется для '
+                'пользователей без роли администратора'
+            )
+
+    def test_rate_limit(self, admin_client, title, profile_rate):
+        for _ in range(2):
+            response = admin_client.get(self.url, {'profile': '1'})
+            assert response['Content-Type'] == 'application/zip'
+        response = admin_client.get(self.url, {'profile': '1'})
+        assert response.status_code == 429, (
+            'Проверьте, что частота профилирования ограничена'
+        )
+        assert int(response['Retry-After']) > 0
+
+    def test_rate_limit_per_admin(self, admin_client, django_user_model,
+                                  title, profile_rate):
+        from rest_framework.test import APIClient
+
+        from api.authentication import issue_token
+
+        for _ in range(3):
+            admin_client.get(self.url, {'profile': '1'})
+        other = django_user_model.objects.create_user(
+            username='OtherAdmin', email='otheradmin@yamdb.fake',
+            role='admin'
+        )
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {issue_token(other)}')
+        response = other_client.get(self.url, {'profile': '1'})
+        assert response['Content-Type'] == 'application/zip', (
+            'Проверьте, что у каждого администратора своя корзина '
+            'профилирования'
+        )
+
+    def test_one_speedscope_profile_at_a_time(self, admin_client, title):
+        from api.profiling import SamplingProfiler
+
+        with SamplingProfiler.running:
+            response = admin_client.get(self.url,
+                                        {'profile': 'speedscope'})
+            assert response.status_code == 429, (
+                'Проверьте, что процесс выполняет не больше одного профиля '
+                'speedscope за раз'
+            )
+            response = admin_client.get(self.url, {'profile': 'pstats'})
+            assert response['Content-Type'] == 'application/zip'
+        response = admin_client.get(self.url, {'profile': 'speedscope'})
+        assert response['Content-Type'] == 'application/zip'
+
+    def test_disabled(self, admin_client, title, settings):
+        settings.API_PROFILER = False
+        response = admin_client.get(self.url, {'profile': 'pstats'})
+        assert response['Content-Type'] == 'application/json'
+
+
+def test_concurrent_sampling_restores_switch_interval():
+    from api.profiling import ProfilerBusy, SamplingProfiler
+
+    switch_interval = sys.getswitchinterval()
+    barrier = threading.Barrier(8)
+
+    def profile(index):
+        profiler = SamplingProfiler(interval=0.0001)
+        barrier.wait()
+        try:
+            profiler.start()
+        except ProfilerBusy:
+            return False
+        try:
+            sum(range(100000))
+        finally:
+            profiler.stop()
+        return True
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        started = list(executor.map(profile, range(8)))
+    assert any(started)
+    assert sys.getswitchinterval() == switch_interval, (
+        'Проверьте, что одновременные профили speedscope не оставляют '
+        'процессу уменьшенный интервал переключения потоков'
+    )
@@ -0,0 +1,48 @@
+import pytest
+
+from .utils import assert_queries_do_not_grow
+
+
+@pytest.mark.django_db
+class TestQueryCount:
+
+    def test_titles_list(self, client, category, genres):
+        from reviews.models import GenreTitle, Title
+
+        def create_title(index):
+            title = Title.objects.create(name=f'Произведение {index}',
+                                         year=2000, category=category)
+            for genre in genres:
+                GenreTitle.objects.create(title=title, genre=genre)
+
+        assert_queries_do_not_grow(client, '/api/v1/titles/', create_title)
+
+    def test_reviews_list(self, client, title, django_user_model):
+        from reviews.models import Review
+
+        def create_review(index):
+            author = django_user_model.objects.create(
+                username=f'reviewer{index}', email=f'reviewer{index}@ya.ru'
+            )
+            Review.objects.create(title=title, author=author, text='Отзыв',
+                                  score=5)
+
+        assert_queries_do_not_grow(
+            client, f'/api/v1/titles/{title.id}/reviews/', create_review
+        )
+
+    def test_comments_list(self, client, review, django_user_model):
+        from reviews.models import Comment
+
+        def create_comment(index):
+            author = django_user_model.objects.create(
+                username=f'commenter{index}', email=f'commenter{index}@ya.ru'
+            )
+            Comment.objects.create(review=review, author=author,
+                                   text='Комментарий')
+
+        assert_queries_do_not_grow(
+            client,
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/',
+            create_comment
+        )
@@ -0,0 +1,98 @@
+import pytest
+
+
+def totals(title):
+    title.refresh_from_db()
+    return title.reviews_count, title.scores_sum, title.rating
+
+
+@pytest.fixture
+def other_title():
+    from reviews.models import Title
+    return Title.objects.create(name='Другое', year=1990)
+
+
+@pytest.mark.django_db
+class TestRatingCounters:
+
+    def test_create(self, title, user, admin):
+        from reviews.models import Review
+
+        Review.objects.create(title=title, author=user, text='А', score=8)
+        assert totals(title) == (1, 8, 8.0)
+        Review.objects.create(title=title, author=admin, text='Б', score=5)
+        assert totals(title) == (2, 13, 6.5), (
+            'Проверьте, что новый отзыв увеличивает сумму оценок и число '
+            'отзывов произведения'
+        )
+
+    def test_score_change(self, title, review):
+        review.score = 3
+        review.save()
+        assert totals(title) == (1, 3, 3.0), (
+            'Проверьте, что смена оценки сдвигает сумму оценок'
+        )
+
+    def test_delete(self, title, review, admin):
+        from reviews.models import Review
+
+        Review.objects.create(title=title, author=admin, text='Б', score=4)
+        review.delete()
+        assert totals(title) == (1, 4, 4.0)
+        Review.objects.get().delete()
+        assert totals(title) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов нет рейтинга'
+        )
+
+    def test_title_reassignment(self, title, other_title, review):
+        review.title = other_title
+        review.score = 6
+        review.save()
+        assert totals(title) == (0, 0, None)
+        assert totals(other_title) == (1, 6, 6.0), (
+            'Проверьте, что перенос отзыва переносит его оценку'
+        )
+
+    def test_reloaded_review(self, title, review):
+        from reviews.models import Review
+
+        reloaded = Review.objects.get(pk=review.pk)
+        reloaded.score = 10
+        reloaded.save()
+        assert totals(title) == (1, 10, 10.0)
+
+
+@pytest.mark.django_db
+class TestRebuildRatings:
+
+    def corrupt(self, title):
+        from reviews.models import Title
+
+        Title.objects.filter(pk=title.pk).update(
+            reviews_count=5, scores_sum=1, rating=0.2
+        )
+
+    def test_check_reports_stale(self, title, review):
+        from io import StringIO
+
+        from django.core.management import CommandError, call_command
+
+        self.corrupt(title)
+        with pytest.raises(CommandError, match='1 titles have stale'):
+            call_command('rebuild_ratings', '--check', stdout=StringIO())
+
+    def test_rebuild_repairs(self, title, other_title, review):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        self.corrupt(title)
+        self.corrupt(other_title)
+        call_command('rebuild_ratings', stdout=StringIO())
+        assert totals(title) == (1, 8, 8.0), (
+            'Проверьте, что rebuild_ratings восстанавливает счетчики'
+        )
+        assert totals(other_title) == (0, 0, None)
+        output = StringIO()
+        call_command('rebuild_ratings', '--check', stdout=output)
+        assert 'consistent' in output.getvalue()
@@ -0,0 +1,68 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from api import renderers
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+DATA = ReturnDict([
+    ('id', 1),
+    ('name', 'Крестный отец\u2028\u2029'),
+    ('rating', None),
+    ('score', 7.5),
+    ('pub_date', datetime.datetime(2022, 1, 2, 3, 4, 5, 678901,
+                                   tzinfo=timezone.utc)),
+    ('local', datetime.datetime(2022, 1, 2, 3, 4, 5)),
+    ('day', datetime.date(2022, 1, 2)),
+    ('time', datetime.time(3, 4, 5)),
+    ('price', decimal.Decimal('1.50')),
+    ('uuid', uuid.UUID('12345678123456781234567812345678')),
+    ('detail', gettext_lazy('Not found.')),
+    ('genre', [{'name': 'Драма', 'slug': 'drama'}]),
+    ('counts', {1: 'one'}),
+], serializer=None)
+
+
+def test_renderer_matches_drf_output():
+    assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA), (
+        'Проверьте, что ORJSONRenderer выводит тот же JSON, что и '
+        'JSONRenderer DRF'
+    )
+
+
+def test_renderer_with_indent_uses_stdlib():
+    media_type = 'application/json; indent=4'
+    assert (ORJSONRenderer().render(DATA, media_type)
+            == JSONRenderer().render(DATA, media_type))
+
+
+def test_renderer_without_orjson(monkeypatch):
+    monkeypatch.setattr(renderers, 'orjson', None)
+    assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+def test_parser():
+    parser = ORJSONParser()
+    data = parser.parse(io.BytesIO('{"name": "Драма", "n": [1]}'.encode()))
+    assert data == {'name': 'Драма', 'n': [1]}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"name": '))
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"score": NaN}'))
+
+
+@pytest.mark.django_db
+def test_api_uses_orjson(client, title):
+    response = client.get(f'/api/v1/titles/{title.id}/')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response.json()['name'] == title.name
@@ -0,0 +1,209 @@
+import pytest
+
+REPLICA = 'replica_test'
+
+
+@pytest.fixture
+def replica(settings, tmp_path, title):
+    """Реплика-заглушка: отдельная БД SQLite со схемой проекта и копией
+    произведения без отзывов, как отставшая реплика."""
+    from django.core.management import call_command
+    from django.db import connections
+    from django.test import override_settings
+
+    from api.replicas import replayed
+    from reviews.models import Title
+
+    connections.databases[REPLICA] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    connections.ensure_defaults(REPLICA)
+    connections.prepare_test_settings(REPLICA)
+    # ReplicaRouter не дает менять схему реплик.
+    with override_settings(DATABASE_ROUTERS=[]):
+        call_command('migrate', database=REPLICA, verbosity=0)
+    Title.objects.using(REPLICA).bulk_create([
+        Title(pk=title.pk, name=title.name, year=title.year),
+        Title(name='Только в реплике', year=2001),
+    ])
+    settings.DATABASE_REPLICAS = [REPLICA]
+    settings.API_CACHE_TIMEOUT = 0
+    replayed.clear()
+    yield REPLICA
+    replayed.clear()
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.databases[REPLICA]
+
+
+@pytest.fixture
+def positions(monkeypatch, settings):
+    """Позиции журнала: SQLite их не знает, поэтому они подменяются."""
+    import api.replicas
+
+    values = {'default': 10, REPLICA: 10}
+    monkeypatch.setattr(api.replicas, 'wal_position', values.get)
+    monkeypatch.setattr('api.cache.wal_position', values.get)
+    settings.API_CACHE_TIMEOUT = 600
+    return values
+
+
+def reviews_url(title):
+    return f'/api/v1/titles/{title.id}/reviews/'
+
+
+def title_names(client):
+    return {item['name'] for item
+            in client.get('/api/v1/titles/').json()['results']}
+
+
+@pytest.mark.django_db
+class TestReplicas:
+
+    def test_reads_go_to_replica(self, client, replica):
+        from reviews.models import Title
+
+        only_replica = Title.objects.using(replica).get(
+            name='Только в реплике')
+        response = client.get(f'/api/v1/titles/{only_replica.id}/')
+        assert response.status_code == 200, (
+            'Проверьте, что запросы GET читают из реплики'
+        )
+        assert response.json()['name'] == 'Только в реплике'
+
+    def test_read_your_writes(self, client, user_client, title, replica):
+        response = user_client.post(reviews_url(title),
+                                    {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201, (
+            'Проверьте, что запись выполняется в основной БД'
+        )
+        texts = [review['text'] for review
+                 in user_client.get(reviews_url(title)).json()['results']]
+        assert texts == ['Отзыв'], (
+            'Проверьте, что автор сразу после записи читает из основной БД'
+        )
+        assert client.get(reviews_url(title)).json()['results'] == [], (
+            'Проверьте, что остальные клиенты читают из реплики'
+        )
+
+    def test_pin_expires(self, user_client, title, replica, settings):
+        settings.REPLICA_PIN_SECONDS = 0
+        user_client.post(reviews_url(title), {'text': 'Отзыв', 'score': 8})
+        assert user_client.get(reviews_url(title)).json()['results'] == []
+
+    def test_rest_of_request_after_write(self, title, replica):
+        from api.replicas import ReplicaRouter, Routing, current
+        from reviews.models import Review
+
+        router = ReplicaRouter()
+        assert router.db_for_read(Review) is None
+        token = current.set(Routing(replica))
+        try:
+            assert router.db_for_read(Review) == replica
+            assert router.db_for_write(Review) == 'default'
+            assert router.db_for_read(Review) is None, (
+                'Проверьте, что после записи запрос читает из основной БД'
+            )
+        finally:
+            current.reset(token)
+
+    def test_cached_responses_from_primary(self, client, title, replica,
+                                           settings):
+        settings.API_CACHE_TIMEOUT = 600
+        names = {item['name'] for item
+                 in client.get('/api/v1/titles/').json()['results']}
+        assert names == {title.name}, (
+            'Проверьте, что кэшируемые ответы не строятся по реплике, '
+            'позицию которой не узнать'
+        )
+
+    def test_cached_responses_from_fresh_replica(self, client, title,
+                                                 replica, positions):
+        from api.cache import TITLES, get_cache, position_key
+
+        get_cache().set(position_key(TITLES), 10)
+        assert 'Только в реплике' in title_names(client), (
+            'Проверьте, что ответы для кэша строятся по догнавшей реплике'
+        )
+
+    def test_lagging_replica(self, client, title, replica, positions):
+        from api.cache import TITLES, get_cache, position_key
+
+        assert 'Только в реплике' in title_names(client)
+        get_cache().set(position_key(TITLES), 12)
+        assert title_names(client) == {title.name}, (
+            'Проверьте, что из кэша не берутся данные, построенные раньше '
+            'последней записи, а отставшая реплика не используется'
+        )
+        positions[REPLICA] = 12
+        assert 'Только в реплике' in title_names(client), (
+            'Проверьте, что догнавшая реплика снова используется'
+        )
+
+    def test_version_from_same_database(self, client, title, replica,
+                                        positions):
+        from api.cache import get_cache, position_key, title_scope
+        from reviews.models import Title
+
+        Title.objects.filter(pk=title.pk).update(name='Новое название')
+        Title.objects.using(replica).filter(pk=title.pk).update(version=100)
+        positions[REPLICA] = 5
+        get_cache().set(position_key(title_scope(title.pk)), 10)
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['name'] == 'Новое название'
+        etag = response['ETag']
+        positions[REPLICA] = 10
+        response = client.get(f'/api/v1/titles/{title.id}/',
+                              HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что версия для ETag читается из той же БД, что и '
+            'данные ответа'
+        )
+
+
+def test_migrations_only_on_primary():
+    from api.replicas import ReplicaRouter
+
+    router = ReplicaRouter()
+    assert router.allow_migrate('default', 'reviews')
+    assert not router.allow_migrate('replica_0', 'reviews')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_records_position(settings):
+    from django.db import connection
+
+    from api.cache import GENRES, get_cache, position_key, required_position
+    from api.replicas import wal_position
+    from reviews.models import Genre
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('Позиция журнала есть только у PostgreSQL')
+    settings.DATABASE_REPLICAS = [REPLICA]
+    before = wal_position('default')
+    Genre.objects.create(name='Вестерн', slug='western')
+    recorded = get_cache().get(position_key(GENRES))
+    assert recorded is not None and recorded > before, (
+        'Проверьте, что после записи запоминается позиция журнала '
+        'основной БД'
+    )
+    assert required_position([GENRES]) == recorded
+
+
+def test_replicas_require_shared_cache():
+    import os
+    import subprocess
+    import sys
+
+    from django.conf import settings
+
+    env = dict(os.environ, DB_REPLICA_HOSTS='replica', REDIS_URL='')
+    result = subprocess.run(
+        [sys.executable, '-c', 'import api_yamdb.settings'],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert 'REDIS_URL' in result.stderr, (
+        'Проверьте, что реплики без общего кэша не запускаются'
+    )
@@ -0,0 +1,52 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestSearch:
+    url = '/api/v1/search/'
+
+    def test_search_requires_query(self, client):
+        response = client.get(self.url)
+        assert response.status_code == 400
+
+    def test_search_finds_all_types(self, client, review, user):
+        from reviews.models import Comment, Title
+
+        Title.objects.create(name='Фильм', year=1990,
+                             description='Великий фильм')
+        review.text = 'Великий фильм о семье'
+        review.save()
+        Comment.objects.create(review=review, author=user,
+                               text='Согласен, великий')
+
+        response = client.get(self.url, {'q': 'великий'})
+        assert response.status_code == 200
+        found = {(item['type'], item['id']) for item in response.json()}
+        assert ('review', review.id) in found
+        assert len(found) == 3, (
+            'Проверьте, что поиск находит произведения, отзывы и комментарии'
+        )
+
+    def test_search_ranks_name_above_description(self, client):
+        from reviews.models import Title
+
+        in_description = Title.objects.create(
+            name='Семья', year=1990, description='Снова крестный отец')
+        in_name = Title.objects.create(name='Крестный отец', year=1972)
+        response = client.get(self.url, {'q': 'отец', 'type': 'title'})
+        assert [item['id'] for item in response.json()] == [
+            in_name.id, in_description.id
+        ], 'Проверьте, что совпадение в названии ранжируется выше описания'
+
+    def test_search_follows_updates(self, client, title):
+        response = client.get(self.url, {'q': 'крестный'})
+        assert [item['id'] for item in response.json()] == [title.id]
+        title.name = 'Однажды в Америке'
+        title.save()
+        response = client.get(self.url, {'q': 'крестный'})
+        assert response.json() == [], (
+            'Проверьте, что поисковый индекс обновляется при сохранении'
+        )
+        title.delete()
+        response = client.get(self.url, {'q': 'америке'})
+        assert response.json() == []
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/auth/signup/'
+
+
+@pytest.fixture
+def no_throttling(settings):
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = {}
+    settings.REST_FRAMEWORK = rest_framework
+
+
+def users_table_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'reviews_user' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestSignup:
+
+    def test_new_user(self, client, django_user_model):
+        data = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(URL, data=data)
+        assert response.status_code == 200
+        assert response.json() == data
+        user = django_user_model.objects.get(username='newbie')
+        assert user.confirmation_code
+        assert len(users_table_queries(context)) <= 2, (
+            'Проверьте, что регистрация не проверяет занятость username и '
+            'email отдельными запросами'
+        )
+
+    def test_repeated_signup_keeps_code(self, client, django_user_model):
+        data = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+        client.post(URL, data=data)
+        code = django_user_model.objects.get().confirmation_code
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(URL, data=data)
+        assert response.status_code == 200
+        assert django_user_model.objects.get().confirmation_code == code
+        if connection.vendor == 'postgresql':
+            assert len(users_table_queries(context)) == 1
+
+    @pytest.mark.parametrize('data, message', [
+        ({'username': 'other', 'email': 'testuser@yamdb.fake'},
+         'Email уже используется'),
+        ({'username': 'TestUser', 'email': 'other@yamdb.fake'},
+         'Username уже используется'),
+    ])
+    def test_conflicts(self, client, user, data, message,
+                       django_user_model):
+        response = client.post(URL, data=data)
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': [message]}
+        assert django_user_model.objects.count() == 1
+
+    def test_retries_are_limited(self, client, monkeypatch):
+        from reviews.models import SIGNUP_ATTEMPTS, SignupUserManager
+
+        calls = []
+
+        def lost_race(manager, username, email, using):
+            calls.append(username)
+            return []
+
+        monkeypatch.setattr(SignupUserManager, 'upsert', lost_race)
+        monkeypatch.setattr(SignupUserManager, 'create_or_match', lost_race)
+        response = client.post(URL, data={
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+        assert response.status_code == 503, (
+            'Проверьте, что после всех повторов регистрация возвращает 503, '
+            'а не ошибку о занятом username'
+        )
+        assert len(calls) == SIGNUP_ATTEMPTS
+
+    def test_blank_emails_do_not_collide(self, django_user_model):
+        django_user_model.objects.create(username='first')
+        django_user_model.objects.create(username='second')
+        assert django_user_model.objects.filter(email='').count() == 2
+
+
+@pytest.mark.parametrize('username, email, expected', [
+    ('newbie', 'newbie@yamdb.fake', None),
+    ('other', 'taken@yamdb.fake', 'email'),
+    ('taken', 'other@yamdb.fake', 'username'),
+    ('taken', 'second@yamdb.fake', 'email'),
+])
+def test_signup_classification(username, email, expected):
+    from reviews.models import SignupConflict, User, classify_signup
+
+    rows = {
+        'newbie': [(User(username='newbie', email='newbie@yamdb.fake'),
+                    False)],
+        'other': [(User(username='taken', email='taken@yamdb.fake'),
+                   False)],
+        'taken': [(User(username='taken', email='taken@yamdb.fake'), False),
+                  (User(username='second', email='second@yamdb.fake'),
+                   False)],
+    }[username]
+    if expected is None:
+        assert classify_signup(rows, username, email) == rows[0]
+        return
+    with pytest.raises(SignupConflict) as conflict:
+        classify_signup(rows, username, email)
+    assert conflict.value.field == expected
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('no_throttling')
+def test_concurrent_signups(django_user_model):
+    from django.db import connections
+    from django.test import Client
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('Конкурентная регистрация проверяется на PostgreSQL')
+
+    def signup(index):
+        try:
+            return index % 4, Client().post(URL, data={
+                'username': f'racer{index % 4}', 'email': 'race@yamdb.fake'
+            }).status_code
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(signup, range(32)))
+
+    user = django_user_model.objects.get(email='race@yamdb.fake')
+    for index, status_code in results:
+        expected = 200 if user.username == f'racer{index}' else 400
+        assert status_code == expected, (
+            'Проверьте, что при одновременной регистрации email достается '
+            'одному пользователю, а остальные получают ошибку 400'
+        )
+    assert user.confirmation_code
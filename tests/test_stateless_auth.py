@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def bearer_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def users_table_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'reviews_user' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestStatelessAuth:
+
+    def test_token_contains_claims(self, client, user):
+        from django.contrib.auth.tokens import PasswordResetTokenGenerator
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        code = PasswordResetTokenGenerator().make_token(user)
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username, 'confirmation_code': code
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert token['role'] == user.role
+        assert token['is_superuser'] is False
+        assert token['token_version'] == user.token_version
+
+    def test_permissions_do_not_read_users_table(self, admin_client,
+                                                 category):
+        admin_client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                '/api/v1/genres/', data={'name': 'Драма', 'slug': 'drama'}
+            )
+        assert response.status_code == 201
+        assert not users_table_queries(context), (
+            'Проверьте, что аутентификация и проверка прав берут роль из '
+            'токена, не читая таблицу пользователей'
+        )
+
+    def test_owner_can_edit_review(self, user_client, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.id}/'
+        response = user_client.patch(url, data={'text': 'Новый текст'})
+        assert response.status_code == 200
+        assert response.json()['author'] == review.author.username
+
+    def test_create_review_with_claims_user(self, user_client, title, user):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={'text': 'Текст', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        response = user_client.post(url, data={'text': 'Еще', 'score': 5})
+        assert response.status_code == 400
+
+    def test_profile_is_loaded_from_db(self, user_client, user):
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['email'] == user.email
+
+    def test_role_change_revokes_token(self, admin_client, user,
+                                       user_client):
+        from api.authentication import issue_token
+
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+        response = admin_client.patch(f'/api/v1/users/{user.username}/',
+                                      data={'role': 'moderator'})
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что после смены роли старый токен отклоняется'
+        )
+        user.refresh_from_db()
+        client = bearer_client(issue_token(user))
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['role'] == 'moderator'
+
+    def test_profile_edit_keeps_token(self, user_client):
+        response = user_client.patch('/api/v1/users/me/',
+                                     data={'bio': 'Обо мне'})
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+
+    def test_deleted_user_token_is_revoked(self, user, user_client):
+        user.delete()
+        assert user_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_revocation_survives_cache_miss(self, user, user_client):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+
+        get_user_model().objects.filter(pk=user.pk).update(token_version=5)
+        cache.clear()
+        assert user_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_token_without_claims_uses_db(self, user):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        client = bearer_client(AccessToken.for_user(user))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert users_table_queries(context)
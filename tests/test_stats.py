@@ -0,0 +1,124 @@
+import pytest
+
+
+def assert_summary_consistent():
+    from reviews.summary import actual_counts, stored_counts
+
+    assert stored_counts() == actual_counts(), (
+        'Проверьте, что сводка отзывов обновляется вместе с отзывами, '
+        'произведениями и жанрами'
+    )
+
+
+@pytest.fixture
+def reviews(title, review, django_user_model):
+    from reviews.models import Review
+
+    authors = [
+        django_user_model.objects.create(username=f'critic{index}',
+                                         email=f'critic{index}@ya.ru')
+        for index in range(2)
+    ]
+    return [review] + [
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=score)
+        for author, score in zip(authors, (4, 9))
+    ]
+
+
+@pytest.mark.django_db
+class TestReviewSummary:
+
+    def test_review_changes(self, title, reviews, category):
+        from reviews.models import Title
+
+        assert_summary_consistent()
+        reviews[0].score = 2
+        reviews[0].save()
+        assert_summary_consistent()
+        reviews[1].delete()
+        assert_summary_consistent()
+        other = Title.objects.create(name='Другое', year=2000,
+                                     category=category)
+        reviews[2].title = other
+        reviews[2].save()
+        assert_summary_consistent()
+
+    def test_title_changes(self, title, reviews, genres):
+        from reviews.models import Category
+
+        title.year = 1974
+        title.category = Category.objects.create(name='Книга', slug='books')
+        title.save()
+        assert_summary_consistent()
+        title.genre.remove(genres[0])
+        assert_summary_consistent()
+        title.genre.add(genres[0])
+        assert_summary_consistent()
+        genres[1].title_set.clear()
+        assert_summary_consistent()
+        title.genre.set(genres)
+        assert_summary_consistent()
+
+    def test_deletions(self, title, reviews, category, genres):
+        category.delete()
+        genres[0].delete()
+        assert_summary_consistent()
+        title.delete()
+        assert_summary_consistent()
+
+    def test_rebuild_command(self, title, reviews):
+        from django.core.management import CommandError, call_command
+
+        from reviews.models import ReviewSummary
+
+        ReviewSummary.objects.all().delete()
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+
+
+@pytest.mark.django_db
+class TestStatsEndpoints:
+
+    def test_title_stats(self, client, title, reviews,
+                         django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/stats/')
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` доступен '
+            'без токена'
+        )
+        data = response.json()
+        assert data['id'] == title.id
+        assert data['reviews_count'] == 3
+        assert data['rating'] == 7.0
+        assert data['scores']['8'] == 1
+        assert data['scores']['1'] == 0
+        assert sum(data['scores'].values()) == 3
+
+    def test_title_stats_not_found(self, client):
+        response = client.get('/api/v1/titles/100500/stats/')
+        assert response.status_code == 404
+
+    def test_catalogue_stats(self, client, title, reviews, category,
+                             genres):
+        from reviews.models import Title
+
+        Title.objects.create(name='Без отзывов', year=1990)
+        response = client.get('/api/v1/titles/stats/')
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/titles/stats/` доступен без токена'
+        )
+        data = response.json()
+        assert data['overall']['reviews_count'] == 3
+        assert data['categories'] == [{
+            'name': category.name, 'slug': category.slug,
+            **data['overall'],
+        }]
+        assert [genre['slug'] for genre in data['genres']] == [
+            'drama', 'comedy'
+        ]
+        assert [year['year'] for year in data['years']] == [title.year]
+        assert data['years'][0]['rating'] == 7.0
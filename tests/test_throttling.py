@@ -0,0 +1,117 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+RATES = {
+    'signup_ip': '3/hour',
+    'signup_username': '2/hour',
+    'token_ip': '3/hour',
+    'token_username': '2/hour',
+}
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = RATES
+    settings.REST_FRAMEWORK = rest_framework
+
+
+def signup(client, username, ip='10.0.0.1'):
+    return client.post('/api/v1/auth/signup/', data={
+        'username': username, 'email': f'{username}@yamdb.fake'
+    }, REMOTE_ADDR=ip)
+
+
+@pytest.mark.parametrize('store_path', [
+    'api.throttling.LocalBucketStore',
+    'api.throttling.CacheBucketStore',
+])
+def test_bucket_refills_over_time(store_path):
+    from django.utils.module_loading import import_string
+
+    store = import_string(store_path)()
+    key = f'test:{store_path}'
+    assert [store.consume(key, 2, 60, now=0) for _ in range(2)] == [0, 0]
+    assert store.consume(key, 2, 60, now=0) == pytest.approx(30), (
+        'Проверьте, что пустая корзина сообщает время ожидания токена'
+    )
+    assert store.consume(key, 2, 60, now=30) == 0
+    assert store.consume(key, 2, 60, now=31) > 0
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('throttle_rates')
+class TestAuthThrottling:
+
+    def test_signup_throttled_by_ip(self, client):
+        for index in range(3):
+            assert signup(client, f'user{index}').status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            response = signup(client, 'user3')
+        assert response.status_code == 429, (
+            'Проверьте, что регистрация ограничена по IP-адресу'
+        )
+        assert response.has_header('Retry-After')
+        assert not context.captured_queries, (
+            'Проверьте, что отклоненный запрос не обращается к БД'
+        )
+        assert signup(client, 'user3', ip='10.0.0.2').status_code == 200
+
+    def test_spoofed_forwarded_for(self, client):
+        def signup_via_proxy(username, forwarded_for):
+            return client.post('/api/v1/auth/signup/', data={
+                'username': username, 'email': f'{username}@yamdb.fake'
+            }, REMOTE_ADDR='172.18.0.5', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+        for index in range(3):
+            response = signup_via_proxy(f'user{index}',
+                                        f'1.2.3.{index}, 10.0.3.1')
+            assert response.status_code == 200
+        response = signup_via_proxy('user3', '1.2.3.9, 10.0.3.1')
+        assert response.status_code == 429, (
+            'Проверьте, что подделанный клиентом X-Forwarded-For не дает '
+            'новую корзину: учитывается адрес, записанный прокси'
+        )
+        assert signup_via_proxy('user3', '10.0.3.2').status_code == 200, (
+            'Проверьте, что клиенты за прокси не делят одну корзину'
+        )
+
+    def test_signup_throttled_by_username(self, client):
+        for index in range(2):
+            response = signup(client, 'bot', ip=f'10.0.1.{index}')
+            assert response.status_code == 200
+        response = signup(client, 'BOT', ip='10.0.1.9')
+        assert response.status_code == 429, (
+            'Проверьте, что регистрация ограничена по имени пользователя '
+            'независимо от IP-адреса и регистра'
+        )
+
+    def test_token_obtain_throttled(self, client, user):
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        for index in range(2):
+            response = client.post('/api/v1/auth/token/', data=data,
+                                   REMOTE_ADDR=f'10.0.2.{index}')
+            assert response.status_code == 400
+        response = client.post('/api/v1/auth/token/', data=data,
+                               REMOTE_ADDR='10.0.2.9')
+        assert response.status_code == 429, (
+            'Проверьте, что подбор кода подтверждения ограничен'
+        )
+
+    def test_shared_cache_store(self, client, settings):
+        from api.throttling import reset_store
+
+        settings.AUTH_THROTTLE_STORE = 'api.throttling.CacheBucketStore'
+        reset_store()
+        for index in range(3):
+            assert signup(client, f'user{index}').status_code == 200
+        assert signup(client, 'user3').status_code == 429
+
+
+def test_throttle_without_ident_key_is_rejected():
+    from api.throttling import TokenBucketThrottle
+
+    with pytest.raises(TypeError):
+        class ScopeThrottle(TokenBucketThrottle):
+            scope = 'signup_ip'
@@ -0,0 +1,27 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return len(context.captured_queries)
+
+
+def assert_queries_do_not_grow(client, url, create_item, page_size=None):
+    """Сравнивает число запросов к БД для страницы из одного и из
+    `page_size` объектов: оно не должно зависеть от размера страницы."""
+    page_size = page_size or api_settings.PAGE_SIZE
+    create_item(0)
+    single = count_queries(client, url)
+    for index in range(1, page_size):
+        create_item(index)
+    full = count_queries(client, url)
+    assert full == single, (
+        f'Проверьте, что число запросов к БД для `{url}` не растет с размером '
+        f'страницы: {single} для 1 объекта, {full} для {page_size}'
+    )